@@ -0,0 +1,137 @@
+"""Plays many seeded games with the autopilot across all cores and reports how they went.
+
+Run from the repository root, for example::
+
+    python batch.py --games 100000 --seed 0 --json report.json --csv games.csv
+
+Game ``i`` uses ``random.Random(seed + i)`` for everything, so any single game can be replayed on its own.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from game import BOARD_SIZE
+from headless import Autopilot, new_game, simulate
+from main import Main
+
+
+@dataclass
+class GameRecord:
+    seed: int
+    outcome: str  # 'win', 'caught', 'timeout' or 'error'
+    ticks: int
+    seconds_to_exit: Optional[float]
+    generation_ms: float
+    error: str = ''
+
+
+@dataclass
+class Settings:
+    board_size: int
+    max_ticks: int
+
+
+def play_one(seed: int, settings: Settings) -> GameRecord:
+    game = new_game(settings.board_size, random.Random(seed))
+    try:
+        result = simulate(game, Autopilot(), settings.max_ticks)
+    except RuntimeError as e:
+        # MonsterSwarm.tick refuses to run when a monster sits exactly on its target, e.g. if it spawned on the
+        # player. Anything else is a bug, which shouldn't disappear into the statistics.
+        if game.monsters is None or not game.monsters.stalled():
+            raise
+        return GameRecord(seed=seed, outcome='error', ticks=0, seconds_to_exit=None, generation_ms=0.0, error=str(e))
+    outcome = {True: 'win', False: 'caught', None: 'timeout'}[result.win]
+    return GameRecord(
+        seed=seed,
+        outcome=outcome,
+        ticks=result.ticks,
+        seconds_to_exit=result.ticks / Main.TPS if result.win else None,
+        generation_ms=result.setup_seconds * 1000,
+    )
+
+
+def _play_star(job: tuple[int, Settings]) -> GameRecord:
+    return play_one(*job)
+
+
+def run_batch(games: int, base_seed: int, settings: Settings, processes: Optional[int] = None) -> list[GameRecord]:
+    processes = processes or os.cpu_count() or 1
+    jobs = [(base_seed + i, settings) for i in range(games)]
+    with multiprocessing.Pool(processes) as pool:
+        chunk_size = max(1, games // (processes * 16))
+        records = list(pool.imap_unordered(_play_star, jobs, chunksize=chunk_size))
+    records.sort(key=lambda record: record.seed)
+    return records
+
+
+def summarize(records: list[GameRecord], settings: Settings, wall_seconds: float) -> dict:
+    outcomes = {outcome: sum(record.outcome == outcome for record in records)
+                for outcome in ('win', 'caught', 'timeout', 'error')}
+    played = len(records) - outcomes['error']
+    exit_times = [record.seconds_to_exit for record in records if record.seconds_to_exit is not None]
+    generation_times = [record.generation_ms for record in records if record.outcome != 'error']
+
+    def describe(values: list[float]) -> Optional[dict]:
+        if not values:
+            return None
+        return {'mean': statistics.mean(values), 'p50': statistics.median(values), 'max': max(values)}
+
+    return {
+        'games': len(records),
+        'board_size': settings.board_size,
+        'max_ticks': settings.max_ticks,
+        'outcomes': outcomes,
+        'win_rate': outcomes['win'] / played if played else None,
+        'catch_rate': outcomes['caught'] / played if played else None,
+        'seconds_to_exit': describe(exit_times),
+        'generation_ms': describe(generation_times),
+        'wall_seconds': wall_seconds,
+    }
+
+
+def write_csv(records: list[GameRecord], path: str) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(asdict(records[0]).keys()))
+        writer.writeheader()
+        for record in records:
+            writer.writerow(asdict(record))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE, help='board size')
+    parser.add_argument('--max-ticks', type=int, default=5 * 60 * Main.TPS, help='give up on a game after this')
+    parser.add_argument('--processes', type=int, default=None, help='defaults to the number of cores')
+    parser.add_argument('--json', help='write the summary here')
+    parser.add_argument('--csv', help='write one row per game here')
+    args = parser.parse_args()
+
+    settings = Settings(board_size=args.size, max_ticks=args.max_ticks)
+    start = time.perf_counter()
+    records = run_batch(args.games, args.seed, settings, args.processes)
+    summary = summarize(records, settings, time.perf_counter() - start)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if args.csv and records:
+        write_csv(records, args.csv)
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
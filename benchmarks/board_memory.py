@@ -0,0 +1,67 @@
+"""Compares the memory used by the packed Board against the old list[list[Node]] of dataclasses.
+
+Run from the repository root: ``python -m benchmarks.board_memory [sizes...]``
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+from mazegen.game_structures import Board
+
+DEFAULT_SIZES = [26, 256, 2048]
+# Building millions of dataclasses is slow and heavy, so larger legacy boards are extrapolated from this size
+LEGACY_MEASURE_LIMIT = 512
+
+
+@dataclass
+class LegacyNode:
+    """The per-cell layout the board used before it was packed."""
+    x: int
+    y: int
+    connections: list[bool] = dataclasses.field(init=False, default_factory=lambda: [False, False, False, False])
+    power: int = dataclasses.field(init=False, default=-1)
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return after - before
+
+
+def legacy_bytes(size: int) -> tuple[int, bool]:
+    """Returns (bytes, whether the value was extrapolated)."""
+    if size <= LEGACY_MEASURE_LIMIT:
+        return measure(lambda: [[LegacyNode(x, y) for y in range(size)] for x in range(size)]), False
+    per_cell = legacy_bytes(LEGACY_MEASURE_LIMIT)[0] / LEGACY_MEASURE_LIMIT**2
+    return int(per_cell * size**2), True
+
+
+def packed_bytes(size: int) -> int:
+    def build():
+        board = Board()
+        board.reset(size)
+        return board
+    return measure(build)
+
+
+def main(sizes: list[int]) -> None:
+    print(f'{"size":>6} {"legacy":>14} {"packed":>14} {"B/cell old":>11} {"B/cell new":>11} {"ratio":>7}')
+    for size in sizes:
+        old, estimated = legacy_bytes(size)
+        new = packed_bytes(size)
+        mark = '~' if estimated else ' '
+        print(f'{size:>6} {mark}{old:>13,} {new:>14,} {old / size**2:>11.1f} {new / size**2:>11.1f} '
+              f'{old / new:>6.0f}x')
+    print('~ = extrapolated from a measured legacy board of size', LEGACY_MEASURE_LIMIT)
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
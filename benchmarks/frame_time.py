@@ -0,0 +1,54 @@
+"""Times Game.tick_game frames on an offscreen window at several board sizes.
+
+Run from the repository root: ``python -m benchmarks.frame_time [sizes...]``
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from game import Game
+from main import Main
+
+DEFAULT_SIZES = [26, 100, 400, 1000]
+FRAMES = 300
+SEED = 1234
+
+
+def frame_times(size: int) -> list[float]:
+    main = Main()
+    canvas = pygame.display.set_mode((main.x_size, main.y_size))
+    game = Game(main, canvas, board_size=size)
+    random.seed(SEED)
+    game.run_game()
+    # Only the player and the maze are measured; monsters would end the game before we're done
+    game.monsters.clear()
+    times = []
+    for _ in range(FRAMES):
+        main.number_tick += 1
+        start = time.perf_counter()
+        game.tick_game()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main(sizes: list[int]) -> None:
+    pygame.init()
+    print(f'{"size":>6} {"mean (ms)":>10} {"p50 (ms)":>10} {"max (ms)":>10}')
+    for size in sizes:
+        times = frame_times(size)
+        print(f'{size:>6} {statistics.mean(times) * 1000:>10.3f} {statistics.median(times) * 1000:>10.3f} '
+              f'{max(times) * 1000:>10.3f}')
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,67 @@
+"""Times monster pathing with HPA* against a BFS flow field over the whole board.
+
+Run from the repository root: ``python -m benchmarks.hpa [sizes...]``
+
+A flow field is one BFS of the whole board per player cell, after which every monster query is a lookup. HPA* is
+built once per board; after that each player cell costs one search of the abstract graph, and each monster query
+looks at the entrances of the monster's cluster. Every query is also checked to give a path as short as the BFS.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from mazegen import generator
+from mazegen.game_structures import Board
+from mazegen.hpa import HierarchicalPathfinder
+from mazegen.pathfinding import FlowField
+
+DEFAULT_SIZES = [26, 100, 300]
+TARGETS = 20
+QUERIES = 200  # monster cells per target
+SEED = 1234
+
+
+def bfs_length(field: FlowField, x: int, y: int) -> int:
+    steps = 0
+    while (x, y) != (field.target_x, field.target_y):
+        x, y = field.next_cell(x, y)
+        steps += 1
+    return steps
+
+
+def main(sizes: list[int]) -> None:
+    print(f'{"size":>6} {"build (s)":>10} {"nodes":>7} {"BFS ms/target":>14} {"HPA* ms/target":>15} '
+          f'{"HPA* us/query":>14} {"same lengths":>13}')
+    for size in sizes:
+        rng = random.Random(SEED)
+        board = Board()
+        generator.fill(board, size, rng)
+        start = time.perf_counter()
+        pathfinder = HierarchicalPathfinder(board, capacity=0)
+        build_time = time.perf_counter() - start
+
+        targets = [(rng.randrange(size), rng.randrange(size)) for _ in range(TARGETS)]
+        queries = [(rng.randrange(size), rng.randrange(size)) for _ in range(QUERIES)]
+        bfs_time = hpa_time = query_time = 0.0
+        same = True
+        for target_x, target_y in targets:
+            start = time.perf_counter()
+            field = FlowField(board, target_x, target_y)
+            bfs_time += time.perf_counter() - start
+            start = time.perf_counter()
+            target = pathfinder.get(target_x, target_y)
+            hpa_time += time.perf_counter() - start
+            start = time.perf_counter()
+            for x, y in queries:
+                target.direction(x, y)
+            query_time += time.perf_counter() - start
+            same = same and all(target.path_length(x, y) == bfs_length(field, x, y) for x, y in queries[:20])
+        print(f'{size:>6} {build_time:>10.3f} {len(pathfinder):>7} {bfs_time / TARGETS * 1000:>14.3f} '
+              f'{hpa_time / TARGETS * 1000:>15.3f} {query_time / TARGETS / QUERIES * 1e6:>14.1f} {str(same):>13}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,55 @@
+"""Times one tick of N monsters: MonsterSwarm against a list of Monster objects.
+
+Run from the repository root: ``python -m benchmarks.monsters [counts...]``
+
+The board is large and the player stays put, so nobody gets caught and every tick does the full amount of work.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from entity.monster import Monster
+from entity.swarm import default_speed
+from headless import new_game
+
+DEFAULT_COUNTS = [5, 50, 500, 5000]
+BOARD_SIZE = 300
+TICKS = 60
+# Ticking Monster objects one by one gets slow; above this only the swarm is timed
+OBJECT_LIMIT = 5000
+SEED = 1234
+
+
+def time_ticks(tick, ticks: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ticks):
+        tick()
+    return (time.perf_counter() - start) / ticks
+
+
+def main(counts: list[int]) -> None:
+    print(f'{"monsters":>9} {"swarm ms/tick":>14} {"objects ms/tick":>16} {"speed-up":>9}')
+    for count in counts:
+        game = new_game(BOARD_SIZE, random.Random(SEED))
+        game.monster_count = count
+        game.run_game()
+        swarm_time = time_ticks(game.monsters.tick, TICKS)
+        if count > OBJECT_LIMIT:
+            print(f'{count:>9} {swarm_time * 1000:>14.3f} {"-":>16} {"-":>9}')
+            continue
+        rng = random.Random(SEED)
+        monsters = [Monster(game=game, _x=-1.0, _y=-1.0, speed=default_speed(i, rng)) for i in range(count)]
+
+        def tick_objects():
+            for monster in monsters:
+                monster.tick()
+        object_time = time_ticks(tick_objects, TICKS)
+        print(f'{count:>9} {swarm_time * 1000:>14.3f} {object_time * 1000:>16.3f} '
+              f'{object_time / swarm_time:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_COUNTS)
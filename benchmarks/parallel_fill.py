@@ -0,0 +1,42 @@
+"""Times fill_parallel against generator.fill for one board size and a range of tile counts.
+
+Run from the repository root: ``python -m benchmarks.parallel_fill [size] [tiles per side...]``
+
+The speed-up can't exceed the number of cores; with one core this measures the overhead of tiling.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+
+from mazegen import generator
+from mazegen.game_structures import Board
+from mazegen.parallel import fill_parallel
+
+DEFAULT_SIZE = 1000
+DEFAULT_TILES = [1, 2, 4, 8]
+SEED = 1234
+
+
+def timed(fill, *args) -> float:
+    start = time.perf_counter()
+    fill(Board(), *args)
+    return time.perf_counter() - start
+
+
+def main(size: int, tile_counts: list[int]) -> None:
+    print(f'{os.cpu_count()} cores, board size {size}')
+    serial = timed(generator.fill, size, random.Random(SEED))
+    print(f'{"tiles":>7} {"tile size":>10} {"seconds":>8} {"speed-up":>9}')
+    print(f'{"fill":>7} {"-":>10} {serial:>8.3f} {1:>8.2f}x')
+    for tiles in tile_counts:
+        tile_size = -(-size // tiles)
+        seconds = timed(fill_parallel, size, random.Random(SEED), tile_size)
+        print(f'{tiles * tiles:>7} {tile_size:>10} {seconds:>8.3f} {serial / seconds:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE, [int(arg) for arg in sys.argv[2:]] or DEFAULT_TILES)
@@ -0,0 +1,52 @@
+"""Checks spread_power against spread_power_reference and times both.
+
+Run from the repository root: ``python -m benchmarks.power_spread [sizes...]``
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+from array import array
+
+from mazegen import generator
+from mazegen.game_structures import Board
+
+DEFAULT_SIZES = [26, 64, 128, 1000]
+# The reference implementation is quadratic, so it is skipped above this size
+REFERENCE_LIMIT = 128
+SEED = 1234
+
+
+def carved_board(size: int) -> Board:
+    rng = random.Random(SEED)
+    board = Board()
+    board.reset(size)
+    board.maze_exit_x = rng.randrange(size)
+    board.maze_exit_y = rng.randrange(size)
+    board.masks = generator.carve(size, board.maze_exit_x * size + board.maze_exit_y, rng)
+    return board
+
+
+def timed_spread(board: Board, spread) -> tuple[float, bytes]:
+    board.powers = array('b', [-1]) * (board.size ** 2)
+    start = time.perf_counter()
+    spread(board, random.Random(SEED))
+    return time.perf_counter() - start, board.powers.tobytes()
+
+
+def main(sizes: list[int]) -> None:
+    print(f'{"size":>6} {"fast (s)":>10} {"reference (s)":>14} {"identical":>10}')
+    for size in sizes:
+        board = carved_board(size)
+        fast_time, fast_powers = timed_spread(board, generator.spread_power)
+        if size <= REFERENCE_LIMIT:
+            ref_time, ref_powers = timed_spread(board, generator.spread_power_reference)
+            print(f'{size:>6} {fast_time:>10.4f} {ref_time:>14.4f} {str(fast_powers == ref_powers):>10}')
+        else:
+            print(f'{size:>6} {fast_time:>10.4f} {"-":>14} {"-":>10}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,63 @@
+"""Times Game.snapshot and Game.restore, against deep-copying the whole game, and Monte Carlo rollouts built on them.
+
+Run from the repository root: ``python -m benchmarks.snapshots [monster counts...]``
+"""
+
+from __future__ import annotations
+
+import copy
+import random
+import sys
+import time
+
+from game import PlayerInput, Playing
+from headless import new_game
+
+DEFAULT_COUNTS = [5, 500]
+REPEATS = 2000
+DEEPCOPY_REPEATS = 20
+ROLLOUTS = 200
+ROLLOUT_TICKS = 60
+SEED = 1234
+
+
+def per_second(action, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        action()
+    return repeats / (time.perf_counter() - start)
+
+
+def main(counts: list[int]) -> None:
+    print(f'{"monsters":>9} {"snapshots/s":>12} {"restores/s":>11} {"deepcopies/s":>13} {"rollout ticks/s":>16}')
+    for count in counts:
+        game = new_game(rng=random.Random(SEED))
+        game.monster_count = count
+        game.run_game()
+        while game.monsters.stalled():
+            # With hundreds of monsters on the board, one often spawns on the player, which step() refuses
+            game.run_game()
+        snapshot = game.snapshot()
+        snapshots = per_second(game.snapshot, REPEATS)
+        restores = per_second(lambda: game.restore(snapshot), REPEATS)
+        deepcopies = per_second(lambda: copy.deepcopy(game), DEEPCOPY_REPEATS)
+
+        # Random walks of ROLLOUT_TICKS from the same state, as a bot searching for a move would do
+        moves = random.Random(SEED)
+        ticks = 0
+        start = time.perf_counter()
+        for _ in range(ROLLOUTS):
+            game.restore(snapshot)
+            player_input = PlayerInput(**{key: moves.random() < 0.5 for key in ('up', 'left', 'down', 'right')})
+            for _ in range(ROLLOUT_TICKS):
+                game.main.number_tick += 1
+                game.step(player_input)
+                ticks += 1
+                if game.playing != Playing.GAME:
+                    break
+        rollout_rate = ticks / (time.perf_counter() - start)
+        print(f'{count:>9} {snapshots:>12.0f} {restores:>11.0f} {deepcopies:>13.0f} {rollout_rate:>16.0f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_COUNTS)
@@ -0,0 +1,267 @@
+"""Benchmark suite for the hot paths: generation, pathfinding, physics and rendering.
+
+Run from the repository root::
+
+    python -m benchmarks.suite                              # print the results
+    python -m benchmarks.suite --save baseline.json         # ... and store them
+    python -m benchmarks.suite --compare baseline.json      # exit with 1 if anything got slower than the threshold
+
+Everything is seeded and runs on SDL's dummy video driver, so it works on a headless Linux box.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+from game import BOARD_SIZE, CELL_SIZE, PLAYER_SIZE, THICKNESS, Game, PhysicsMode, Playing
+from headless import new_game
+from main import Main
+from mazegen import generator
+from mazegen.game_structures import Board, D
+
+SEED = 1234
+DEFAULT_THRESHOLD = 0.25  # fail a comparison if p50 got more than 25% slower
+ALLOCATION_SAMPLES = 5
+# Returned by a timed function when the call did something other than what's being measured, to drop the sample
+DISCARD = object()
+
+
+@dataclass
+class Case:
+    name: str
+    # Builds whatever the case needs and returns the function to time; called once per case. The function may
+    # return DISCARD, and then that call isn't counted.
+    setup: Callable[[], Callable[[], object]]
+    repeat: int
+
+
+@dataclass
+class Result:
+    name: str
+    runs: int
+    mean_ms: float
+    p50_ms: float
+    p99_ms: float
+    peak_alloc_kib: float  # most memory one call had allocated at any point, according to tracemalloc
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def run_case(case: Case) -> Result:
+    fn = case.setup()
+    fn()  # warm up
+    times = []
+    while len(times) < case.repeat:
+        start = time.perf_counter()
+        if fn() is not DISCARD:
+            times.append(time.perf_counter() - start)
+    times.sort()
+
+    # tracemalloc slows everything down, so allocations get their own few runs
+    peak = 0
+    tracemalloc.start()
+    samples = 0
+    while samples < min(ALLOCATION_SAMPLES, case.repeat):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        if fn() is not DISCARD:
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+            samples += 1
+    tracemalloc.stop()
+
+    return Result(
+        name=case.name,
+        runs=case.repeat,
+        mean_ms=statistics.mean(times) * 1000,
+        p50_ms=percentile(times, 0.5) * 1000,
+        p99_ms=percentile(times, 0.99) * 1000,
+        peak_alloc_kib=peak / 1024,
+    )
+
+
+# Cases
+
+def generation(size: int) -> Callable[[], Callable[[], None]]:
+    def setup():
+        rng = random.Random(SEED)
+
+        def fn():
+            generator.fill(Board(), size, rng)
+        return fn
+    return setup
+
+
+def started_headless_game(size: int = BOARD_SIZE) -> Game:
+    game = new_game(size, random.Random(SEED))
+    game.run_game()
+    return game
+
+
+def find_next_path(cold: bool) -> Callable[[], Callable[[], None]]:
+    """Monsters at random cells looking for the player.
+
+    Warm keeps the player in one cell, like most ticks of a real game; cold moves the player to a random cell and
+    clears the flow field cache every time.
+    """
+    def setup():
+        game = started_headless_game()
+        monsters = game.monsters
+        first = np.array([0])
+        rng = random.Random(SEED)
+        size = game.board.size
+
+        def fn():
+            monsters.x[0] = rng.randrange(size) * CELL_SIZE + CELL_SIZE // 2
+            monsters.y[0] = rng.randrange(size) * CELL_SIZE + CELL_SIZE // 2
+            if cold:
+                game.player_x = rng.randrange(size) * CELL_SIZE + CELL_SIZE // 2
+                game.player_y = rng.randrange(size) * CELL_SIZE + CELL_SIZE // 2
+                game.flow_fields.clear()
+            monsters.find_next_path(first)
+        return fn
+    return setup
+
+
+def find_closed_wall(board: Board, direction: int) -> tuple[int, int]:
+    for x in range(board.size):
+        for y in range(board.size):
+            if not board.board[x][y].connections[direction]:
+                return x, y
+    raise RuntimeError('every cell is open in that direction')
+
+
+def physics(against_wall: bool, mode: PhysicsMode = PhysicsMode.SWEPT) -> Callable[[], Callable[[], None]]:
+    """do_physics in the middle of a cell, or flying into a wall (fast enough for legacy to halve many times)."""
+    def setup():
+        game = started_headless_game()
+        game.physics_mode = mode
+        x, y = find_closed_wall(game.board, D.RIGHT)
+        if against_wall:
+            start_x = (x + 1) * CELL_SIZE - THICKNESS - PLAYER_SIZE - 1
+            velocity = 40.0
+        else:
+            start_x = x * CELL_SIZE + CELL_SIZE // 2
+            velocity = 3.0
+        start_y = y * CELL_SIZE + CELL_SIZE // 2
+
+        def fn():
+            game.player_x = start_x
+            game.player_y = start_y
+            game.x_velocity = velocity
+            game.y_velocity = 0.0
+            game.do_physics()
+        return fn
+    return setup
+
+
+def full_frame() -> Callable[[], Callable[[], object]]:
+    """One tick_game on an offscreen window, monsters included.
+
+    When a game ends, the next game is started in the same call and the sample is dropped, so maze generation never
+    shows up in the frame times.
+    """
+    def setup():
+        pygame.init()
+        main = Main()
+        canvas = pygame.display.set_mode((main.x_size, main.y_size))
+        game = Game(main, canvas, rng=random.Random(SEED))
+        game.run_game()
+
+        def fn():
+            main.number_tick += 1
+            game.tick_game()
+            if game.playing != Playing.GAME:
+                game.run_game()
+                return DISCARD
+        return fn
+    return setup
+
+
+CASES = [
+    Case('fill 26', generation(26), repeat=50),
+    Case('fill 128', generation(128), repeat=10),
+    Case('fill 512', generation(512), repeat=3),
+    Case('find_next_path warm', find_next_path(cold=False), repeat=2000),
+    Case('find_next_path cold', find_next_path(cold=True), repeat=500),
+    Case('do_physics open', physics(against_wall=False), repeat=5000),
+    Case('do_physics wall', physics(against_wall=True), repeat=5000),
+    Case('do_physics legacy open', physics(against_wall=False, mode=PhysicsMode.LEGACY), repeat=5000),
+    Case('do_physics legacy wall', physics(against_wall=True, mode=PhysicsMode.LEGACY), repeat=5000),
+    Case('tick_game frame', full_frame(), repeat=300),
+]
+
+
+# Reporting
+
+def print_results(results: list[Result], baseline: Optional[dict[str, Result]] = None) -> None:
+    header = f'{"case":<22} {"runs":>6} {"mean ms":>10} {"p50 ms":>10} {"p99 ms":>10} {"peak KiB":>10}'
+    if baseline is not None:
+        header += f' {"p50 vs base":>12}'
+    print(header)
+    for result in results:
+        line = (f'{result.name:<22} {result.runs:>6} {result.mean_ms:>10.4f} {result.p50_ms:>10.4f} '
+                f'{result.p99_ms:>10.4f} {result.peak_alloc_kib:>10.1f}')
+        if baseline is not None and result.name in baseline:
+            line += f' {result.p50_ms / baseline[result.name].p50_ms - 1:>+11.1%}'
+        print(line)
+
+
+def load_baseline(path: str) -> dict[str, Result]:
+    with open(path) as f:
+        return {entry['name']: Result(**entry) for entry in json.load(f)}
+
+
+def regressions(results: list[Result], baseline: dict[str, Result], threshold: float) -> list[str]:
+    failed = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is not None and result.p50_ms > base.p50_ms * (1 + threshold):
+            failed.append(f'{result.name}: p50 {base.p50_ms:.4f} ms -> {result.p50_ms:.4f} ms')
+    return failed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='compare against results saved with --save')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed p50 slowdown as a fraction (default: %(default)s)')
+    parser.add_argument('--only', help='only run cases whose name contains this')
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if args.only is None or args.only in case.name]
+    results = [run_case(case) for case in cases]
+    baseline = load_baseline(args.compare) if args.compare else None
+    print_results(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+    if baseline is not None:
+        failed = regressions(results, baseline, args.threshold)
+        if failed:
+            print(f'\nRegressed by more than {args.threshold:.0%}:')
+            for line in failed:
+                print(f'  {line}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
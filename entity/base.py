@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import abc
+import dataclasses
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 import math
@@ -16,6 +17,9 @@ class BaseEntity:
     game: Game
     _x: float
     _y: float
+    # Where the entity was before the last simulation step, for drawing it in between two steps
+    previous_x: float = dataclasses.field(init=False, default=0.0)
+    previous_y: float = dataclasses.field(init=False, default=0.0)
 
     @property
     def x(self) -> int:
@@ -25,13 +29,19 @@ class BaseEntity:
     def y(self) -> int:
         return math.floor(self._y)
 
+    def save_position(self) -> None:
+        self.previous_x = self._x
+        self.previous_y = self._y
+
     @property
     def display_x(self) -> int:
-        return math.floor(self.x + self.game.alignment_x)
+        x = self.previous_x + (self._x - self.previous_x) * self.game.interpolation
+        return math.floor(math.floor(x) + self.game.alignment_x)
 
     @property
     def display_y(self) -> int:
-        return math.floor(self.y + self.game.alignment_y)
+        y = self.previous_y + (self._y - self.previous_y) * self.game.interpolation
+        return math.floor(math.floor(y) + self.game.alignment_y)
 
     @abc.abstractmethod
     def on_touch(self) -> None:
@@ -42,7 +52,7 @@ class BaseEntity:
         pass
 
     @abc.abstractmethod
-    def draw(self, canvas: pygame.Surface) -> None:
+    def draw(self, canvas: pygame.Surface) -> pygame.Rect:
         pass
 
     @abc.abstractmethod
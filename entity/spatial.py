@@ -0,0 +1,113 @@
+"""A uniform grid over the maze cells, to find the entities near a point without looking at all of them.
+
+Entities are identified by their index into the position arrays of their owner (see :class:`MonsterSwarm`). Every
+bucket is one maze cell, so "which monsters are in this cell" is a dict lookup, and anything within CELL_SIZE of a
+point is in the 3x3 buckets around it.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+
+import numpy as np
+
+
+class SpatialHash:
+    def __init__(self, board_size: int, cell_size: int):
+        self.board_size = board_size
+        self.cell_size = cell_size
+        self.buckets: defaultdict[int, set[int]] = defaultdict(set)
+        self.cells = np.zeros(0, dtype=np.int64)  # bucket key of every entity, x * board_size + y
+        # Buckets holding more than one entity, for separation
+        self.crowded: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def key(self, cell_x: int, cell_y: int) -> int:
+        return cell_x * self.board_size + cell_y
+
+    def _keys(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        cell_x = np.floor(x).astype(np.int64) // self.cell_size
+        cell_y = np.floor(y).astype(np.int64) // self.cell_size
+        return cell_x * self.board_size + cell_y
+
+    def _add(self, i: int, key: int) -> None:
+        bucket = self.buckets[key]
+        bucket.add(i)
+        if len(bucket) == 2:
+            self.crowded.add(key)
+
+    def _remove(self, i: int, key: int) -> None:
+        bucket = self.buckets[key]
+        bucket.discard(i)
+        if len(bucket) == 1:
+            self.crowded.discard(key)
+        elif not bucket:
+            del self.buckets[key]
+
+    def extend(self, x: np.ndarray, y: np.ndarray) -> None:
+        """Adds entities ``len(self)`` to ``len(x) - 1``, at those positions."""
+        first = len(self.cells)
+        keys = self._keys(x[first:], y[first:])
+        for i, key in enumerate(keys.tolist(), first):
+            self._add(i, key)
+        self.cells = np.concatenate((self.cells, keys))
+
+    def clear(self) -> None:
+        self.buckets.clear()
+        self.crowded.clear()
+        self.cells = np.zeros(0, dtype=np.int64)
+
+    def update(self, x: np.ndarray, y: np.ndarray) -> None:
+        """Moves the entities that changed cell to their new buckets. Most don't, so this is mostly one comparison."""
+        keys = self._keys(x, y)
+        for i in np.flatnonzero(keys != self.cells).tolist():
+            self._remove(i, int(self.cells[i]))
+            self._add(i, int(keys[i]))
+        self.cells = keys
+
+    def in_cell(self, cell_x: int, cell_y: int) -> set[int]:
+        if not (0 <= cell_x < self.board_size and 0 <= cell_y < self.board_size):
+            return set()
+        return self.buckets.get(self.key(cell_x, cell_y), set())
+
+    def in_cells(self, x_range: range, y_range: range) -> list[int]:
+        """Every entity in the given columns and rows of cells. Cells off the board are skipped."""
+        found = []
+        size = self.board_size
+        for cell_x in range(max(0, x_range.start), min(size, x_range.stop)):
+            for cell_y in range(max(0, y_range.start), min(size, y_range.stop)):
+                bucket = self.buckets.get(self.key(cell_x, cell_y))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+    def _cell_range(self, low: float, high: float) -> range:
+        return range(max(0, int(low // self.cell_size)), min(self.board_size - 1, int(high // self.cell_size)) + 1)
+
+    def in_rect(self, x_min: float, y_min: float, x_max: float, y_max: float) -> list[int]:
+        """Candidates in the buckets overlapping the rect; entities near its edge may lie just outside it."""
+        return self.in_cells(self._cell_range(x_min, x_max), self._cell_range(y_min, y_max))
+
+    def in_radius(self, x: np.ndarray, y: np.ndarray, center_x: float, center_y: float,
+                  radius: float) -> np.ndarray:
+        """Indices of the entities within ``radius`` of the centre, given everyone's positions."""
+        candidates = np.array(self.in_rect(center_x - radius, center_y - radius, center_x + radius,
+                                           center_y + radius), dtype=np.int64)
+        if len(candidates) == 0:
+            return candidates
+        close = (x[candidates] - center_x) ** 2 + (y[candidates] - center_y) ** 2 <= radius ** 2
+        return candidates[close]
+
+    def crowded_pairs(self) -> tuple[np.ndarray, np.ndarray]:
+        """Every pair (i, j), i < j, of entities that share a cell."""
+        first = []
+        second = []
+        for key in self.crowded:
+            members = sorted(self.buckets[key])
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    first.append(members[a])
+                    second.append(members[b])
+        return np.array(first, dtype=np.int64), np.array(second, dtype=np.int64)
@@ -0,0 +1,338 @@
+"""All the monsters of a game as parallel NumPy arrays, moved in one batch per tick.
+
+Each monster behaves exactly like :class:`entity.monster.Monster`: it walks at its own speed towards the centre of
+the next cell on the flow field to the player, picks a new cell when it gets within 5 pixels of that centre, and
+catches the player when the player is inside the CELL_SIZE square around it.
+
+A :class:`SpatialHash` keeps track of which cell every monster is in, so the player contact test, drawing and the
+optional separation only look at the monsters nearby.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, ClassVar, Optional
+
+import numpy as np
+import pygame
+
+import game
+import util
+from entity.spatial import SpatialHash
+from mazegen.game_structures import OPPOSITE
+from mazegen.pathfinding import AT_TARGET, NO_PATH, FlowField, first_step
+
+if TYPE_CHECKING:
+    from game import Game
+
+ARRIVAL_DISTANCE = 5.0
+MIN_DISTANCE = 0.01
+DRAW_HALF_SIZE = 60
+COLOR = 0xaa0000
+# Monsters sharing a cell that are closer than this push each other apart, if separation is on
+SEPARATION_DISTANCE = 2 * DRAW_HALF_SIZE
+SEPARATION_STRENGTH = 0.25
+# ... by at most this fraction of their speed per tick, so a monster always still makes it to its target
+MAX_PUSH_FRACTION = 0.5
+# How many cells a monster that lost sight of the player searches for the way to where it last saw them
+LAST_SEEN_SEARCH_LIMIT = 64
+
+# Cell delta for every possible flow field direction byte; AT_TARGET and NO_PATH stay put
+_STEP_X = np.zeros(256, dtype=np.int32)
+_STEP_Y = np.zeros(256, dtype=np.int32)
+_STEP_X[:4] = util.D_X
+_STEP_Y[:4] = util.D_Y
+assert AT_TARGET >= 4 and NO_PATH >= 4
+
+
+def default_speed(i: int, rng: random.Random) -> float:
+    """The speeds the original five monsters had: one fast, one medium, the rest slow."""
+    if i == 0:
+        return 2.75 + 1.25 * rng.random()  # 2.75 to 4.0
+    if i == 1:
+        return 2.0 + 1.0 * rng.random()  # 2.0 to 3.0
+    return 1.0 + 1.5 * rng.random()  # 1.0 to 2.5
+
+
+@dataclass(frozen=True)
+class SwarmSnapshot:
+    """Copies of the per-monster arrays of a MonsterSwarm; see MonsterSwarm.snapshot."""
+    arrays: tuple[np.ndarray, ...]  # in the order of MonsterSwarm.STATE
+
+
+class MonsterSwarm:
+    """Structure of arrays: monster ``i`` is at ``(x[i], y[i])``, heading for cell ``(target_x[i], target_y[i])``."""
+
+    def __init__(self, game_: Game, separation: bool = False):
+        self.game = game_
+        self.separation = separation
+        self.index = SpatialHash(game_.board.size, game.CELL_SIZE)
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.previous_x = np.zeros(0)
+        self.previous_y = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.target_x = np.zeros(0, dtype=np.int32)
+        self.target_y = np.zeros(0, dtype=np.int32)
+        # Monsters the flow field has no path for (outside its window), which stay put until it has one
+        self.waiting = np.zeros(0, dtype=bool)
+        # With game.monster_sight: the cell each monster last saw the player in (-1 if none), and the direction it
+        # last stepped in (NO_PATH before the first step)
+        self.last_seen_x = np.zeros(0, dtype=np.int32)
+        self.last_seen_y = np.zeros(0, dtype=np.int32)
+        self.heading = np.zeros(0, dtype=np.uint8)
+        # Rects drawn last frame, which have to be pushed to the display again once the monsters move away
+        self.drawn_rects: list[pygame.Rect] = []
+
+    # Every array that changes during a game; the spatial index is rebuilt from x and y
+    STATE: ClassVar[tuple[str, ...]] = ('x', 'y', 'previous_x', 'previous_y', 'speed', 'target_x', 'target_y',
+                                        'waiting', 'last_seen_x', 'last_seen_y', 'heading')
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def snapshot(self) -> SwarmSnapshot:
+        return SwarmSnapshot(tuple(getattr(self, name).copy() for name in self.STATE))
+
+    def restore(self, snapshot: SwarmSnapshot) -> None:
+        """Puts every monster back where it was. The snapshot stays usable, so it can be restored again."""
+        for name, array in zip(self.STATE, snapshot.arrays):
+            setattr(self, name, array.copy())
+        if len(self.index) == len(self):
+            # Only the monsters that changed cell since the snapshot move, usually few of them
+            self.index.update(self.x, self.y)
+        else:
+            self.index.clear()
+            self.index.extend(self.x, self.y)
+
+    def spawn(self, count: int, speed: Callable[[int, random.Random], float] = default_speed) -> None:
+        """Adds monsters at the centres of random cells.
+
+        Draws from the game's rng in the same order as creating Monster objects one after another did: the speed,
+        then the cell.
+        """
+        rng = self.game.rng
+        size = self.game.board_size  # the whole board, or the part of a chunked board the game is played on
+        speeds = np.empty(count)
+        cells = np.empty((count, 2), dtype=np.int64)
+        for i in range(count):
+            speeds[i] = speed(len(self) + i, rng)
+            cells[i, 0] = rng.randrange(size)
+            cells[i, 1] = rng.randrange(size)
+        positions = cells * game.CELL_SIZE + game.CELL_SIZE // 2
+        first = len(self)
+        self.x = np.concatenate((self.x, positions[:, 0].astype(float)))
+        self.y = np.concatenate((self.y, positions[:, 1].astype(float)))
+        self.previous_x = self.x.copy()
+        self.previous_y = self.y.copy()
+        self.speed = np.concatenate((self.speed, speeds))
+        self.target_x = np.concatenate((self.target_x, np.zeros(count, dtype=np.int32)))
+        self.target_y = np.concatenate((self.target_y, np.zeros(count, dtype=np.int32)))
+        self.waiting = np.concatenate((self.waiting, np.zeros(count, dtype=bool)))
+        self.last_seen_x = np.concatenate((self.last_seen_x, np.full(count, -1, dtype=np.int32)))
+        self.last_seen_y = np.concatenate((self.last_seen_y, np.full(count, -1, dtype=np.int32)))
+        self.heading = np.concatenate((self.heading, np.full(count, NO_PATH, dtype=np.uint8)))
+        self.index.extend(self.x, self.y)
+        self.find_next_path(np.arange(first, len(self)))
+
+    def clear(self) -> None:
+        self.__init__(self.game, self.separation)
+
+    def find_next_path(self, indices: Optional[np.ndarray] = None) -> None:
+        """Points the given monsters (all of them by default) one cell further along the flow field to the player."""
+        if indices is None:
+            indices = np.arange(len(self))
+        if len(indices) == 0:
+            return
+        player_x = int(self.game.player_x // game.CELL_SIZE)
+        player_y = int(self.game.player_y // game.CELL_SIZE)
+        field = self.game.flow_fields.get(player_x, player_y)
+        cell_x = np.floor(self.x[indices]).astype(np.int64) // game.CELL_SIZE
+        cell_y = np.floor(self.y[indices]).astype(np.int64) // game.CELL_SIZE
+        if isinstance(field, FlowField):
+            directions = np.frombuffer(field.directions, dtype=np.uint8)
+            # Flow fields may only cover a window around the player; monsters outside it stay where they are
+            local_x = cell_x - field.origin_x
+            local_y = cell_y - field.origin_y
+            inside = (local_x >= 0) & (local_x < field.width) & (local_y >= 0) & (local_y < field.height)
+            d = np.full(len(indices), NO_PATH, dtype=np.uint8)
+            d[inside] = directions[local_x[inside] * field.height + local_y[inside]]
+        else:
+            # A HierarchicalTarget has no table to index, so ask it for every monster
+            d = np.fromiter((field.direction(x, y) for x, y in zip(cell_x.tolist(), cell_y.tolist())),
+                            dtype=np.uint8, count=len(indices))
+        if self.game.monster_sight and self.game.visibility is not None:
+            d = self.apply_sight(indices, cell_x, cell_y, d, player_x, player_y)
+            self.heading[indices] = np.where(d < 4, d, self.heading[indices])
+        self.target_x[indices] = cell_x + _STEP_X[d]
+        self.target_y[indices] = cell_y + _STEP_Y[d]
+        self.waiting[indices] = d == NO_PATH
+
+    def apply_sight(self, indices: np.ndarray, cell_x: np.ndarray, cell_y: np.ndarray, d: np.ndarray,
+                    player_x: int, player_y: int) -> np.ndarray:
+        """Directions for monsters that only know where the player is while they can see them.
+
+        A monster that sees the player keeps the flow field direction ``d`` and remembers the player's cell. One
+        that doesn't heads for the cell it last saw them in, found with a short search of its own rather than the
+        shared flow fields, so many monsters with different last-seen cells don't push the player's field out of the
+        cache. Once there (or if the search doesn't find it), it forgets and wanders: a random open direction, not
+        back the way it came unless it's a dead end.
+        """
+        game_ = self.game
+        visibility = game_.visibility
+        masks = game_.board.masks
+        size = game_.board.size
+        d = d.copy()
+        for k, (i, x, y) in enumerate(zip(indices.tolist(), cell_x.tolist(), cell_y.tolist())):
+            if visibility.visible(x, y, player_x, player_y):
+                self.last_seen_x[i] = player_x
+                self.last_seen_y[i] = player_y
+                continue
+            seen_x = int(self.last_seen_x[i])
+            seen_y = int(self.last_seen_y[i])
+            if seen_x >= 0 and (seen_x, seen_y) != (x, y):
+                step = first_step(game_.board, x, y, seen_x, seen_y, LAST_SEEN_SEARCH_LIMIT)
+                if step != NO_PATH:
+                    d[k] = step
+                    continue
+            self.last_seen_x[i] = self.last_seen_y[i] = -1
+            mask = masks[x * size + y]
+            open_ = [direction for direction in range(4) if mask >> direction & 1]
+            heading = int(self.heading[i])
+            forward = [direction for direction in open_ if heading >= 4 or direction != OPPOSITE[heading]]
+            d[k] = game_.rng.choice(forward or open_) if open_ else NO_PATH
+        return d
+
+    def _to_targets(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """The centres of every monster's target cell, the offsets to them and the distances (inf while waiting)."""
+        half = game.CELL_SIZE // 2
+        target_x = self.target_x * game.CELL_SIZE + half
+        target_y = self.target_y * game.CELL_SIZE + half
+        direction_x = target_x - np.floor(self.x)
+        direction_y = target_y - np.floor(self.y)
+        distance = np.sqrt(direction_x ** 2 + direction_y ** 2)
+        # Waiting monsters don't move. They count as arrived, so they ask the flow field again every tick.
+        distance[self.waiting] = np.inf
+        return target_x, target_y, direction_x, direction_y, distance
+
+    def stalled(self) -> bool:
+        """Whether a monster sits exactly on its target, which :meth:`tick` refuses (it spawned on the player)."""
+        return len(self) > 0 and bool((self._to_targets()[4] < MIN_DISTANCE).any())
+
+    def tick(self) -> None:
+        """Moves every monster one step, then ends the game if any of them caught the player."""
+        if len(self) == 0:
+            return
+        self.previous_x = self.x.copy()
+        self.previous_y = self.y.copy()
+        target_x, target_y, direction_x, direction_y, distance = self._to_targets()
+        if (distance < MIN_DISTANCE).any():
+            i = int(np.argmax(distance < MIN_DISTANCE))
+            raise RuntimeError(f'distance was too small ({distance[i]} < {MIN_DISTANCE}) - '
+                               f'the monster probably spawned on the player')
+        scale = self.speed / distance
+        self.x += direction_x * scale
+        self.y += direction_y * scale
+
+        floor_x = np.floor(self.x)
+        floor_y = np.floor(self.y)
+        arrived = (np.abs(floor_x - target_x) < ARRIVAL_DISTANCE) & (np.abs(floor_y - target_y) < ARRIVAL_DISTANCE)
+        if arrived.any():
+            indices = np.flatnonzero(arrived)
+            self.x[indices] = target_x[indices]
+            self.y[indices] = target_y[indices]
+            self.find_next_path(indices)
+        if self.separation:
+            self.separate()
+        self.index.update(self.x, self.y)
+
+        if self.touching_player():
+            self.on_touch()
+
+    def touching_player(self) -> bool:
+        """Whether any monster is close enough to catch the player. Only the 3x3 cells around the player can be."""
+        player_cell_x = int(self.game.player_x // game.CELL_SIZE)
+        player_cell_y = int(self.game.player_y // game.CELL_SIZE)
+        nearby = self.index.in_cells(range(player_cell_x - 1, player_cell_x + 2),
+                                     range(player_cell_y - 1, player_cell_y + 2))
+        if not nearby:
+            return False
+        nearby = np.array(nearby, dtype=np.int64)
+        x = np.floor(self.x[nearby])
+        y = np.floor(self.y[nearby])
+        # Same test as pygame.Rect(x - half, y - half, CELL_SIZE, CELL_SIZE).collidepoint(player)
+        half = game.CELL_SIZE // 2
+        player_x = int(self.game.player_x)
+        player_y = int(self.game.player_y)
+        return bool(((x - half <= player_x) & (player_x < x + half)
+                     & (y - half <= player_y) & (player_y < y + half)).any())
+
+    def separate(self) -> None:
+        """Pushes apart monsters that share a cell and overlap, so crowds spread out instead of stacking up."""
+        first, second = self.index.crowded_pairs()
+        if len(first) == 0:
+            return
+        delta_x = self.x[first] - self.x[second]
+        delta_y = self.y[first] - self.y[second]
+        distance = np.sqrt(delta_x ** 2 + delta_y ** 2)
+        overlapping = (distance < SEPARATION_DISTANCE) & (distance > 0)
+        first = first[overlapping]
+        second = second[overlapping]
+        scale = (SEPARATION_DISTANCE - distance[overlapping]) * SEPARATION_STRENGTH / distance[overlapping]
+        push_x = np.zeros(len(self))
+        push_y = np.zeros(len(self))
+        np.add.at(push_x, first, delta_x[overlapping] * scale)
+        np.add.at(push_y, first, delta_y[overlapping] * scale)
+        np.add.at(push_x, second, -delta_x[overlapping] * scale)
+        np.add.at(push_y, second, -delta_y[overlapping] * scale)
+        length = np.sqrt(push_x ** 2 + push_y ** 2)
+        limit = self.speed * MAX_PUSH_FRACTION
+        too_long = length > limit
+        push_x[too_long] *= limit[too_long] / length[too_long]
+        push_y[too_long] *= limit[too_long] / length[too_long]
+        self.x += push_x
+        self.y += push_y
+
+    def on_touch(self) -> None:
+        self.game.end_game(win=False)
+
+    def visible(self, width: int, height: int) -> np.ndarray:
+        """The monsters that may be drawn inside a canvas of this size. The rest are never drawn at all."""
+        # Drawing is interpolated from the previous position, which may be one step away from the indexed one
+        margin = DRAW_HALF_SIZE + float(self.speed.max(initial=0.0)) + 1
+        left = -self.game.alignment_x
+        top = -self.game.alignment_y
+        return np.array(self.index.in_rect(left - margin, top - margin, left + width + margin, top + height + margin),
+                        dtype=np.int64)
+
+    def seen_by_player(self, indices: np.ndarray) -> np.ndarray:
+        """The given monsters that are in a cell the player can see."""
+        visibility = self.game.visibility
+        player_x = int(self.game.player_x // game.CELL_SIZE)
+        player_y = int(self.game.player_y // game.CELL_SIZE)
+        cell_x = (np.floor(self.x[indices]).astype(np.int64) // game.CELL_SIZE).tolist()
+        cell_y = (np.floor(self.y[indices]).astype(np.int64) // game.CELL_SIZE).tolist()
+        seen = [visibility.visible(player_x, player_y, x, y) for x, y in zip(cell_x, cell_y)]
+        return indices[np.array(seen, dtype=bool)] if seen else indices
+
+    def display_positions(self, interpolation: float, indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Where on the canvas the monsters' centres are drawn, ``interpolation`` of the way into the last step."""
+        previous_x = self.previous_x[indices]
+        previous_y = self.previous_y[indices]
+        x = np.floor(previous_x + (self.x[indices] - previous_x) * interpolation)
+        y = np.floor(previous_y + (self.y[indices] - previous_y) * interpolation)
+        return (np.floor(x + self.game.alignment_x).astype(np.int64),
+                np.floor(y + self.game.alignment_y).astype(np.int64))
+
+    def draw(self, canvas: pygame.Surface, interpolation: float) -> list[pygame.Rect]:
+        """Draws the monsters in view and returns the rects drawn."""
+        rects = []
+        size = 2 * DRAW_HALF_SIZE
+        indices = self.visible(*canvas.get_size())
+        if self.game.fog and self.game.visibility is not None:
+            indices = self.seen_by_player(indices)
+        display_x, display_y = self.display_positions(interpolation, indices)
+        for x, y in zip(display_x.tolist(), display_y.tolist()):
+            rects.append(pygame.draw.rect(canvas, COLOR, (x - DRAW_HALF_SIZE, y - DRAW_HALF_SIZE, size, size)))
+        return rects
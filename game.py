@@ -6,15 +6,27 @@ import dataclasses
 import random
 from dataclasses import dataclass
 import enum
+import math
 import sys
-from typing import TYPE_CHECKING
+import time
+from typing import TYPE_CHECKING, Optional
 
 import pygame
 
+import profiler
 import util
 from mazegen import generator
+from mazegen.chunked import ChunkedBoard
+from mazegen.collision import WallGeometry
 from mazegen.game_structures import Board, D
-from entity.monster import Monster
+from mazegen.hpa import HierarchicalPathfinder
+from mazegen.pathfinding import FlowFieldCache
+from mazegen.pregen import MazePool
+from mazegen.visibility import VisibilityTable
+from entity.swarm import MonsterSwarm, SwarmSnapshot
+from render.lightmap import LightMap
+from render.perf_overlay import PerfOverlay
+from render.tile_cache import TileCache
 from util import clear_board, draw_centered_text
 
 if TYPE_CHECKING:
@@ -28,6 +40,8 @@ CELL_SIZE = 440
 OPENING_BUFFER_SIZE = THICKNESS + 135
 PLAYER_SIZE = 15
 PLAYER_ACCEL = 0.65
+MONSTER_COUNT = 5
+FOG_COLOR = 0x0a0a0a
 
 
 class Playing(enum.Enum):
@@ -37,30 +51,122 @@ class Playing(enum.Enum):
     ENDING_LOSE = 3
 
 
+class PhysicsMode(enum.Enum):
+    # One swept test against the precomputed walls; the player slides along walls
+    SWEPT = 0
+    # The original collision: halve the velocity until the move fits, so the player stops dead at walls
+    LEGACY = 1
+
+
+@dataclass(frozen=True)
+class PlayerInput:
+    """The movement keys held down during one tick."""
+    up: bool = False
+    left: bool = False
+    down: bool = False
+    right: bool = False
+
+    @classmethod
+    def from_keyboard(cls) -> PlayerInput:
+        pressed = pygame.key.get_pressed()
+        return cls(up=pressed[pygame.K_w], left=pressed[pygame.K_a], down=pressed[pygame.K_s],
+                   right=pressed[pygame.K_d])
+
+
+@dataclass(frozen=True)
+class GameSnapshot:
+    """The part of a Game that changes while it runs, taken by Game.snapshot. The board is shared, not copied."""
+    board: Board
+    number_tick: int
+    tick_start: int
+    playing: Playing
+    last_outcome: Optional[Playing]
+    player_x: float
+    player_y: float
+    x_velocity: float
+    y_velocity: float
+    previous_player_x: float
+    previous_player_y: float
+    rng_state: tuple
+    monsters: SwarmSnapshot
+
+
 @dataclass
 class Game:
+    """The game itself. With ``canvas=None`` it runs headless: nothing is drawn and no fonts are loaded."""
     main: Main
-    canvas: pygame.Surface
+    canvas: Optional[pygame.Surface]
+    board_size: int = BOARD_SIZE
+    # Everything random in a game (maze, spawns, monster speeds) comes from here; pass a seeded Random to replay it
+    rng: random.Random = random
+    # Boards generated ahead of time; without one, run_game generates the board itself
+    maze_pool: Optional[MazePool] = None
+    physics_mode: PhysicsMode = PhysicsMode.SWEPT
+    monster_count: int = MONSTER_COUNT
+    # Whether monsters sharing a cell push each other apart (the original game lets them overlap)
+    monster_separation: bool = False
+    # Light the maze with a smooth light map instead of the original three flat greys (off: it changes the look)
+    smooth_lighting: bool = False
+    # Play on an effectively endless ChunkedBoard; board_size is then the area the exit and spawns are in
+    chunked: bool = False
+    # Path monsters with HPA* instead of a flow field over the whole board, for big boards (not used when chunked)
+    hierarchical_pathing: bool = False
+    # Only show the cells the player can see down straight corridors, and the monsters in them (F4 toggles it)
+    fog: bool = False
+    # Monsters only chase the player while they can see them (see MonsterSwarm.apply_sight)
+    monster_sight: bool = False
     playing: Playing = dataclasses.field(init=False, default=Playing.MENU)
-    monsters: list = dataclasses.field(init=False, default=None)
+    # ENDING_WIN or ENDING_LOSE once a game has ended (playing itself goes straight back to MENU)
+    last_outcome: Playing = dataclasses.field(init=False, default=None)
+    monsters: MonsterSwarm = dataclasses.field(init=False, default=None)
 
     tick_start: int = dataclasses.field(init=False, default=None)
+    # perf_counter() when the game started; the on-screen timer shows wall time, not ticks
+    start_time: float = dataclasses.field(init=False, default=None)
 
     board: Board = dataclasses.field(init=False)
+    flow_fields: FlowFieldCache | HierarchicalPathfinder = dataclasses.field(init=False, default=None)
+    walls: WallGeometry = dataclasses.field(init=False, default=None)
+    # Built for fog or monster_sight; both need the whole board, so neither works on chunked boards
+    visibility: Optional[VisibilityTable] = dataclasses.field(init=False, default=None)
+    tile_cache: TileCache = dataclasses.field(init=False, default=None)
 
     player_x: float = dataclasses.field(init=False, default=0.0)
     player_y: float = dataclasses.field(init=False, default=0.0)
     x_velocity: float = dataclasses.field(init=False, default=0.0)
     y_velocity: float = dataclasses.field(init=False, default=0.0)
+    # Where the player was before the last step
+    previous_player_x: float = dataclasses.field(init=False, default=0.0)
+    previous_player_y: float = dataclasses.field(init=False, default=0.0)
+    # How far between the previous and the current step a frame is drawn (0 to 1), and where that puts the player
+    interpolation: float = dataclasses.field(init=False, default=1.0)
+    view_x: float = dataclasses.field(init=False, default=0.0)
+    view_y: float = dataclasses.field(init=False, default=0.0)
+
+    menu_text: str = dataclasses.field(init=False, default='DARKNESS: THE ESCAPE')
+    menu_color: int = dataclasses.field(init=False, default=0xffffffff)
+
+    # Parts of the canvas that changed since the display was last updated
+    dirty_rects: list[pygame.Rect] = dataclasses.field(init=False, default_factory=list)
+    full_redraw: bool = dataclasses.field(init=False, default=False)
+    # (alignment_x, alignment_y, x_size, y_size) the maze was last drawn with; if it changes, everything moved
+    last_view: tuple[int, int, int, int] = dataclasses.field(init=False, default=None)
+    time_text: str = dataclasses.field(init=False, default=None)
+    time_rect: pygame.Rect = dataclasses.field(init=False, default=None)
+    show_perf_overlay: bool = dataclasses.field(init=False, default=False)
+    perf_overlay: PerfOverlay = dataclasses.field(init=False, default=None)
 
     font_42: pygame.font.Font = dataclasses.field(init=False)
     font_60: pygame.font.Font = dataclasses.field(init=False)
     font_16_nerd: pygame.font.Font = dataclasses.field(init=False)
 
     def __post_init__(self):
+        if self.headless:
+            return
         self.font_42 = pygame.font.Font('assets/liberationserif.ttf', 42)
         self.font_60 = pygame.font.Font('assets/liberationserif.ttf', 60)
         self.font_16_nerd = pygame.font.Font('assets/jetbrainsmononerd.ttf', 16)
+        self.perf_overlay = PerfOverlay(self.main.profiler, pygame.font.Font('assets/jetbrainsmononerd.ttf', 12))
 
     @property
     def start_rect(self) -> pygame.Rect:
@@ -70,20 +176,53 @@ class Game:
     def quit_rect(self) -> pygame.Rect:
         return pygame.Rect(self.main.x_center - TITLE_W, 380 - TITLE_H, 2 * TITLE_W, 2 * TITLE_H)
 
+    @property
+    def headless(self) -> bool:
+        return self.canvas is None
+
+    @property
+    def idle(self) -> bool:
+        """Whether nothing changes on screen unless the user does something."""
+        return self.playing == Playing.MENU
+
+    def mark_dirty(self, rect: pygame.Rect) -> None:
+        if self.full_redraw:
+            return
+        rect = rect.clip(self.canvas.get_rect())
+        if rect:  # skip anything entirely off-screen
+            self.dirty_rects.append(rect)
+
+    def mark_full_redraw(self) -> None:
+        self.full_redraw = True
+        self.dirty_rects.clear()
+
+    def take_dirty_rects(self) -> list[pygame.Rect]:
+        """Returns the rects to push to the display (empty if nothing changed) and starts collecting anew."""
+        rects = [self.canvas.get_rect()] if self.full_redraw else self.dirty_rects
+        self.dirty_rects = []
+        self.full_redraw = False
+        return rects
+
     def display_menu(self):
         if self.playing == Playing.ENDING_WIN:
-            text = 'YOU WIN!'
-            color = 0x00ff00ff
+            self.menu_text = 'YOU WIN!'
+            self.menu_color = 0x00ff00ff
         elif self.playing == Playing.ENDING_LOSE:
-            text = 'YOU LOSE!'
-            color = 0xff0000ff
+            self.menu_text = 'YOU LOSE!'
+            self.menu_color = 0xff0000ff
         else:
-            text = 'DARKNESS: THE ESCAPE'
-            color = 0xffffffff
+            self.menu_text = 'DARKNESS: THE ESCAPE'
+            self.menu_color = 0xffffffff
 
         self.playing = Playing.MENU
+        if not self.headless:
+            self.draw_menu()
+
+    def draw_menu(self):
         clear_board(self.canvas)
-        draw_centered_text(self.canvas, self.font_60.render(text, True, color), self.main.x_center, 90)
+        self.mark_full_redraw()
+        draw_centered_text(self.canvas, self.font_60.render(self.menu_text, True, self.menu_color),
+                           self.main.x_center, 90)
         pygame.draw.rect(self.canvas, 0x00aa00, self.start_rect)
         draw_centered_text(self.canvas, self.font_42.render('PLAY', True, 0xffffffff), self.main.x_center, 280)
         pygame.draw.rect(self.canvas, 0xaa0000, self.quit_rect)
@@ -91,6 +230,8 @@ class Game:
 
     def handle_event(self, event: pygame.event.Event):
         if self.playing == Playing.MENU:
+            if event.type == pygame.VIDEORESIZE:
+                self.draw_menu()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
                 if self.start_rect.collidepoint(mouse_pos):
@@ -101,63 +242,114 @@ class Game:
 
     def run_game(self) -> None:
         self.tick_start = self.main.number_tick
+        self.start_time = time.perf_counter()
         self.playing = Playing.GAME
-        self.board = Board()
-        generator.fill(self.board, BOARD_SIZE)
+        self.last_view = None
+        self.time_text = None
+        self.time_rect = None
+        if self.chunked:
+            self.board = ChunkedBoard(seed=self.rng.getrandbits(63), exit_within=self.board_size)
+        elif self.maze_pool is not None:
+            self.maze_pool.set_size(self.board_size)
+            self.board = self.maze_pool.pop(self.rng)
+        else:
+            self.board = Board()
+            generator.fill_seeded(self.board, self.board_size, self.rng.getrandbits(63))
+        if self.hierarchical_pathing and not self.chunked:
+            self.flow_fields = HierarchicalPathfinder(self.board)
+        else:
+            self.flow_fields = FlowFieldCache(self.board)
+        self.walls = WallGeometry(self.board)
+        if (self.fog or self.monster_sight) and not self.chunked:
+            self.visibility = VisibilityTable(self.board)
+        else:
+            self.visibility = None
+        if not self.headless:
+            # The light map needs the whole board at once
+            light_map = LightMap(self.board) if self.smooth_lighting and not self.chunked else None
+            self.tile_cache = TileCache(self.board, light_map=light_map)
         # Make up to 60 attempts to spawn in a dark square
         for i in range(60):
-            spawn_x = random.randrange(BOARD_SIZE)
-            spawn_y = random.randrange(BOARD_SIZE)
+            spawn_x = self.rng.randrange(self.board_size)
+            spawn_y = self.rng.randrange(self.board_size)
             if self.board.board[spawn_x][spawn_y].is_darkest():
                 break
         self.player_x = spawn_x * CELL_SIZE + CELL_SIZE // 2
         self.player_y = spawn_y * CELL_SIZE + CELL_SIZE // 2
         self.x_velocity = 0.0
         self.y_velocity = 0.0
-        self.monsters = [
-            Monster(game=self, _x=-1.0, _y=-1.0, speed=2.75+1.25*random.random()),  # 2.75 to 4.0
-            Monster(game=self, _x=-1.0, _y=-1.0, speed=2.0+1.0*random.random()),  # 2.0 to 3.0
-            Monster(game=self, _x=-1.0, _y=-1.0, speed=1.0+1.5*random.random()),  # 1.0 to 2.5
-            Monster(game=self, _x=-1.0, _y=-1.0, speed=1.0+1.5*random.random()),  # 1.0 to 2.5
-            Monster(game=self, _x=-1.0, _y=-1.0, speed=1.0+1.5*random.random()),  # 1.0 to 2.5
-        ]
+        self.previous_player_x = self.view_x = self.player_x
+        self.previous_player_y = self.view_y = self.player_y
+        self.monsters = MonsterSwarm(self, separation=self.monster_separation)
+        self.monsters.spawn(self.monster_count)
+
+    def set_board_size(self, size: int) -> None:
+        """Use a different board size from the next game on."""
+        self.board_size = size
+        if self.maze_pool is not None:
+            self.maze_pool.set_size(size)
 
     def end_game(self, win: bool) -> None:
         self.playing = Playing.ENDING_WIN if win else Playing.ENDING_LOSE
+        self.last_outcome = self.playing
         self.display_menu()
 
     def tick_loop(self) -> None:
-        """Tick loop."""
+        """One fixed simulation step, reading the keyboard. Drawing is left to :meth:`draw_frame`."""
+        if self.playing == Playing.GAME:
+            self.step(PlayerInput.from_keyboard())
+
+    def draw_frame(self, interpolation: float = 1.0) -> None:
         if self.playing == Playing.GAME:
-            self.tick_game()
+            self.render(interpolation)
 
     @property
     def alignment_x(self) -> float:
-        return self.main.x_center - self.player_x
+        return self.main.x_center - self.view_x
 
     @property
     def alignment_y(self) -> float:
-        return self.main.y_center - self.player_y
+        return self.main.y_center - self.view_y
+
+    def visible_cells(self) -> tuple[range, range]:
+        """The columns and rows of cells that overlap the window, including the edges drawn on their left/top."""
+        alignment_x = self.alignment_x
+        alignment_y = self.alignment_y
+        x_first = max(0, math.floor(-alignment_x / CELL_SIZE))
+        y_first = max(0, math.floor(-alignment_y / CELL_SIZE))
+        x_last = min(self.board.size - 1, math.floor((self.main.x_size - alignment_x + THICKNESS) / CELL_SIZE))
+        y_last = min(self.board.size - 1, math.floor((self.main.y_size - alignment_y + THICKNESS) / CELL_SIZE))
+        return range(x_first, x_last + 1), range(y_first, y_last + 1)
 
     def tick_game(self) -> None:
-        """Game tick loop."""
+        """One step and one frame, for callers that don't run a fixed-timestep loop."""
+        self.step(PlayerInput.from_keyboard())
+        if self.playing == Playing.GAME:
+            self.render()
+
+    def step(self, player_input: PlayerInput) -> None:
+        """Advance the simulation by one tick. Doesn't touch the canvas, so it also works headless."""
+        mark = self.main.profiler.mark
+        self.previous_player_x = self.player_x
+        self.previous_player_y = self.player_y
 
         # Movement
-        if pygame.key.get_pressed()[pygame.K_w]:
+        if player_input.up:
             self.y_velocity -= PLAYER_ACCEL
-        if pygame.key.get_pressed()[pygame.K_a]:
+        if player_input.left:
             self.x_velocity -= PLAYER_ACCEL
-        if pygame.key.get_pressed()[pygame.K_s]:
+        if player_input.down:
             self.y_velocity += PLAYER_ACCEL
-        if pygame.key.get_pressed()[pygame.K_d]:
+        if player_input.right:
             self.x_velocity += PLAYER_ACCEL
         self.x_velocity *= 0.93
         self.y_velocity *= 0.93
 
+        mark(profiler.INPUT)
+
         # Rectangular collision physics
         self.do_physics()
-        self.player_x += self.x_velocity
-        self.player_y += self.y_velocity
+        mark(profiler.PHYSICS)
 
         cell_x = int(self.player_x / CELL_SIZE)
         cell_y = int(self.player_y / CELL_SIZE)
@@ -165,46 +357,130 @@ class Game:
             self.end_game(True)
             return
 
-        # Rendering
+        self.monsters.tick()
+        mark(profiler.MONSTERS)
+
+    def snapshot(self) -> GameSnapshot:
+        """Captures the simulation state, for restore() to go back to, e.g. to try several moves ahead.
+
+        Only the small mutable state is copied. The board, flow fields and wall geometry are shared, so the board
+        must not change in between.
+        """
+        return GameSnapshot(
+            board=self.board,
+            number_tick=self.main.number_tick,
+            tick_start=self.tick_start,
+            playing=self.playing,
+            last_outcome=self.last_outcome,
+            player_x=self.player_x,
+            player_y=self.player_y,
+            x_velocity=self.x_velocity,
+            y_velocity=self.y_velocity,
+            previous_player_x=self.previous_player_x,
+            previous_player_y=self.previous_player_y,
+            rng_state=self.rng.getstate(),
+            monsters=self.monsters.snapshot(),
+        )
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """Goes back to a snapshot of this game. The same snapshot can be restored any number of times."""
+        if snapshot.board is not self.board:
+            raise ValueError('the snapshot was taken on a different board')
+        self.main.number_tick = snapshot.number_tick
+        self.tick_start = snapshot.tick_start
+        self.playing = snapshot.playing
+        self.last_outcome = snapshot.last_outcome
+        self.player_x = snapshot.player_x
+        self.player_y = snapshot.player_y
+        self.x_velocity = snapshot.x_velocity
+        self.y_velocity = snapshot.y_velocity
+        self.previous_player_x = snapshot.previous_player_x
+        self.previous_player_y = snapshot.previous_player_y
+        self.rng.setstate(snapshot.rng_state)
+        self.monsters.restore(snapshot.monsters)
+
+    def render(self, interpolation: float = 1.0) -> None:
+        """Draw the game onto the canvas, ``interpolation`` of the way from the previous step to the current one."""
+        self.interpolation = interpolation
+        self.view_x = self.previous_player_x + (self.player_x - self.previous_player_x) * interpolation
+        self.view_y = self.previous_player_y + (self.player_y - self.previous_player_y) * interpolation
+        view = (math.floor(self.alignment_x), math.floor(self.alignment_y), self.main.x_size, self.main.y_size)
+        if view != self.last_view:
+            # The maze scrolled (or the window was resized), so every pixel may have changed
+            self.mark_full_redraw()
+            self.last_view = view
         clear_board(self.canvas)
-        for x in range(BOARD_SIZE):
-            for y in range(BOARD_SIZE):
-                x_c = int(x * CELL_SIZE + self.alignment_x)
-                y_c = int(y * CELL_SIZE + self.alignment_y)
-                node_power_color = self.board.board[x][y].color()
-                cell_color = 0xffffff if x == self.board.maze_exit_x and y == self.board.maze_exit_y else node_power_color
-                pygame.draw.rect(self.canvas, cell_color,
-                                 pygame.Rect(x_c + THICKNESS, y_c + THICKNESS, CELL_SIZE - 2 * THICKNESS,
-                                             CELL_SIZE - 2 * THICKNESS))
-                # Left sided edge
-                if self.board.board[x][y].connections[D.LEFT]:
-                    # edge color is the darker of the two node colors
-                    edge_color = min(node_power_color, self.board.board[x-1][y].color())
-                    pygame.draw.rect(self.canvas, edge_color,
-                                     pygame.Rect(x_c - THICKNESS, y_c + OPENING_BUFFER_SIZE, 2 * THICKNESS,
-                                                 CELL_SIZE - 2 * OPENING_BUFFER_SIZE))
-                # Top sided edge
-                if self.board.board[x][y].connections[D.UP]:
-                    edge_color = min(node_power_color, self.board.board[x][y-1].color())
-                    pygame.draw.rect(self.canvas, edge_color,
-                                     pygame.Rect(x_c + OPENING_BUFFER_SIZE, y_c - THICKNESS,
-                                                 CELL_SIZE - 2 * OPENING_BUFFER_SIZE, 2 * THICKNESS))
+        x_range, y_range = self.visible_cells()
+        if x_range and y_range:
+            self.tile_cache.draw(self.canvas, x_range, y_range, self.alignment_x, self.alignment_y)
+            if self.fog and self.visibility is not None:
+                self.draw_fog(x_range, y_range)
         # Player
         pygame.draw.rect(self.canvas, 0xff00ff,
                          pygame.Rect(self.main.x_center - PLAYER_SIZE, self.main.y_center - PLAYER_SIZE,
                                      2 * PLAYER_SIZE, 2 * PLAYER_SIZE))
 
-        for x in self.monsters:
-            x.tick()
-
-        if self.tick_start:
-            ticks_passed = self.main.number_tick - self.tick_start
-            seconds = ticks_passed // self.main.TPS
+        rects = self.monsters.draw(self.canvas, interpolation)
+        # Both where they are now and where they were last frame have to be pushed to the display
+        for rect in rects:
+            self.mark_dirty(rect)
+        for rect in self.monsters.drawn_rects:
+            self.mark_dirty(rect)
+        self.monsters.drawn_rects = rects
+        mark = self.main.profiler.mark
+        mark(profiler.MAZE)
+
+        if self.start_time is not None:
+            seconds = int(time.perf_counter() - self.start_time)
             time_text = f'\uf64f {seconds // 60:02d}:{seconds % 60:02d}'
-            util.draw_right_align_text(self.canvas, self.font_16_nerd.render(time_text, True, 0x00ffffff),
-                                       self.main.x_size - 5, 5)
-
-    def do_physics(self):
+            time_surface = self.font_16_nerd.render(time_text, True, 0x00ffffff)
+            time_rect = util.draw_right_align_text(self.canvas, time_surface, self.main.x_size - 5, 5)
+            if time_text != self.time_text:
+                self.mark_dirty(time_rect)
+                if self.time_rect is not None:
+                    self.mark_dirty(self.time_rect)
+            self.time_text = time_text
+            self.time_rect = time_rect
+        if self.show_perf_overlay:
+            self.mark_dirty(self.perf_overlay.draw(self.canvas, 5, 5))
+        mark(profiler.HUD)
+
+    def toggle_fog(self) -> None:
+        """Turns the fog on or off, straight away if a game is running."""
+        self.fog = not self.fog
+        if self.fog and self.visibility is None and self.playing == Playing.GAME and not self.chunked:
+            self.visibility = VisibilityTable(self.board)
+        self.mark_full_redraw()
+
+    def draw_fog(self, x_range: range, y_range: range) -> None:
+        """Covers the cells on screen the player can't see. Seeing only changes when the view scrolls."""
+        player_x = int(self.player_x // CELL_SIZE)
+        player_y = int(self.player_y // CELL_SIZE)
+        alignment_x = math.floor(self.alignment_x)
+        alignment_y = math.floor(self.alignment_y)
+        screen = self.canvas.get_rect()
+        for x in x_range:
+            for y in y_range:
+                if not self.visibility.visible(player_x, player_y, x, y):
+                    # fill() moves rects that start off the surface instead of cutting them, so clip first
+                    rect = pygame.Rect(x * CELL_SIZE + alignment_x, y * CELL_SIZE + alignment_y, CELL_SIZE, CELL_SIZE)
+                    self.canvas.fill(FOG_COLOR, rect.clip(screen))
+
+    def do_physics(self) -> None:
+        """Move the player by its velocity without going through any walls."""
+        if self.physics_mode == PhysicsMode.LEGACY:
+            self.do_physics_legacy()
+            self.player_x += self.x_velocity
+            self.player_y += self.y_velocity
+            return
+        self.player_x, self.player_y, blocked_x, blocked_y = self.walls.move(
+            self.player_x, self.player_y, self.x_velocity, self.y_velocity)
+        if blocked_x:
+            self.x_velocity = 0.0
+        if blocked_y:
+            self.y_velocity = 0.0
+
+    def do_physics_legacy(self):
         x_before, y_before = self.player_x, self.player_y
         x_after, y_after = x_before + self.x_velocity, y_before + self.y_velocity
         x_min = min(x_before - PLAYER_SIZE, x_after - PLAYER_SIZE)
@@ -260,7 +536,7 @@ class Game:
                 # If the Euclidean velocity is >=0.4, reduce by half and try again.
                 self.x_velocity *= 0.5
                 self.y_velocity *= 0.5
-                self.do_physics()  # Do this again, since this function modifies the velocity.
+                self.do_physics_legacy()  # Do this again, since this function modifies the velocity.
             else:
                 # If it's negligible, simply stop.
                 self.x_velocity = 0
@@ -0,0 +1,138 @@
+"""Runs the game without a window and without the frame cap, for balance tuning and bots.
+
+Run from the repository root: ``python headless.py [--ticks N] [--games N] [--seed N] [--size N]``
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from game import BOARD_SIZE, CELL_SIZE, Game, PhysicsMode, PlayerInput, Playing
+from main import Main
+from mazegen.pathfinding import FlowField
+
+# Decides what the player does on the coming tick
+Controller = Callable[[Game], PlayerInput]
+
+IDLE = PlayerInput()
+
+
+@dataclass
+class SimulationResult:
+    win: Optional[bool]  # None if the game was still going after max_ticks
+    ticks: int
+    setup_seconds: float = 0.0  # time spent in run_game, which is almost all generator.fill
+
+
+def new_game(board_size: int = BOARD_SIZE, rng: random.Random = random) -> Game:
+    """A Game that never draws anything. It doesn't need pygame.init() or a display."""
+    return Game(Main(), None, board_size=board_size, rng=rng)
+
+
+def idle_controller(game: Game) -> PlayerInput:
+    return IDLE
+
+
+class Autopilot:
+    """Walks the player along a shortest path to the exit, from cell centre to cell centre. Ignores monsters."""
+    # With drag 0.93 the player coasts about 0.93 / 0.07 ~ 13 times its velocity before stopping
+    COAST_FACTOR = 13.3
+    DEAD_ZONE = 3.0
+    # How far off the centre line the player may be and still fit through an opening
+    ALIGN_TOLERANCE = 40.0
+
+    def __init__(self):
+        self.board = None
+        self.field = None
+
+    def __call__(self, game: Game) -> PlayerInput:
+        if self.board is not game.board:
+            self.board = game.board
+            self.field = FlowField(game.board, game.board.maze_exit_x, game.board.maze_exit_y)
+        cell_x = int(game.player_x // CELL_SIZE)
+        cell_y = int(game.player_y // CELL_SIZE)
+        next_x, next_y = self.field.next_cell(cell_x, cell_y)
+        target_x = next_x * CELL_SIZE + CELL_SIZE / 2
+        target_y = next_y * CELL_SIZE + CELL_SIZE / 2
+        # Line up with the opening before going through it
+        if next_x != cell_x and abs(target_y - game.player_y) > self.ALIGN_TOLERANCE:
+            target_x = cell_x * CELL_SIZE + CELL_SIZE / 2
+        if next_y != cell_y and abs(target_x - game.player_x) > self.ALIGN_TOLERANCE:
+            target_y = cell_y * CELL_SIZE + CELL_SIZE / 2
+        push_x = self._push(target_x - game.player_x, game.x_velocity)
+        push_y = self._push(target_y - game.player_y, game.y_velocity)
+        return PlayerInput(up=push_y < 0, left=push_x < 0, down=push_y > 0, right=push_x > 0)
+
+    def _push(self, delta: float, velocity: float) -> int:
+        """Which way to accelerate so we end up at delta without overshooting it."""
+        remaining = delta - velocity * self.COAST_FACTOR
+        if remaining > self.DEAD_ZONE:
+            return 1
+        if remaining < -self.DEAD_ZONE:
+            return -1
+        return 0
+
+
+def scripted(inputs: Sequence[PlayerInput]) -> Controller:
+    """Replays one input per tick, then stands still."""
+    def controller(game: Game) -> PlayerInput:
+        tick = game.main.number_tick - game.tick_start - 1
+        return inputs[tick] if tick < len(inputs) else IDLE
+    return controller
+
+
+def simulate(game: Game, controller: Controller, max_ticks: int) -> SimulationResult:
+    """Starts a new game and steps it as fast as possible until it ends or max_ticks have passed."""
+    start = time.perf_counter()
+    game.run_game()
+    setup_seconds = time.perf_counter() - start
+    main = game.main
+    for tick in range(1, max_ticks + 1):
+        main.number_tick += 1
+        game.step(controller(game))
+        if game.playing != Playing.GAME:
+            return SimulationResult(win=game.last_outcome == Playing.ENDING_WIN, ticks=tick,
+                                    setup_seconds=setup_seconds)
+    return SimulationResult(win=None, ticks=max_ticks, setup_seconds=setup_seconds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=60 * Main.TPS, help='maximum ticks per game')
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--size', type=int, default=BOARD_SIZE, help='board size')
+    parser.add_argument('--autopilot', action='store_true', help='walk to the exit instead of standing still')
+    parser.add_argument('--legacy-physics', action='store_true', help='use the original halving collision')
+    parser.add_argument('--chunked', action='store_true',
+                        help='play on an endless chunked board, with the exit and spawns within --size cells')
+    parser.add_argument('--hpa', action='store_true', help='path monsters with hierarchical pathfinding')
+    parser.add_argument('--monster-sight', action='store_true', help='monsters only chase a player they can see')
+    args = parser.parse_args()
+
+    total_ticks = 0
+    start = time.perf_counter()
+    for i in range(args.games):
+        rng = random.Random(None if args.seed is None else args.seed + i)
+        controller = Autopilot() if args.autopilot else idle_controller
+        game = new_game(args.size, rng)
+        if args.legacy_physics:
+            game.physics_mode = PhysicsMode.LEGACY
+        game.chunked = args.chunked
+        game.hierarchical_pathing = args.hpa
+        game.monster_sight = args.monster_sight
+        result = simulate(game, controller, args.ticks)
+        total_ticks += result.ticks
+        outcome = {True: 'win', False: 'lose', None: 'timeout'}[result.win]
+        print(f'game {i}: {outcome} after {result.ticks} ticks')
+    elapsed = time.perf_counter() - start
+    print(f'{total_ticks} ticks in {elapsed:.2f}s ({total_ticks / elapsed / 1000:.1f} ticks/ms, '
+          f'including generation)')
+
+
+if __name__ == '__main__':
+    main()
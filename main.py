@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass, field
 from typing import ClassVar
 
 import pygame
 
-from game import Game
+import profiler
+from game import BOARD_SIZE, Game
+from mazegen.pregen import MazePool
+from profiler import Profiler
 
 
 __version__ = '1.0.0-dev'
@@ -17,11 +21,16 @@ WINDOW_FLAGS = pygame.RESIZABLE
 
 @dataclass
 class Main:
-    TPS: ClassVar[int] = 60
+    TPS: ClassVar[int] = 60  # simulation steps per second, whatever the frame rate
+    MAX_FPS: ClassVar[int] = 144
+    IDLE_TPS: ClassVar[int] = 15  # while nothing is moving (the menu), there's no need to spin at the full rate
+    # Most steps to run in one frame to catch up; after a longer stall the game slows down instead of freezing
+    MAX_CATCH_UP_STEPS: ClassVar[int] = 5
     x_size: int = 1280
     y_size: int = 720
 
     number_tick: int = 0
+    profiler: Profiler = field(default_factory=Profiler)
 
     @property
     def x_center(self) -> int:
@@ -32,18 +41,40 @@ class Main:
         return self.y_size // 2
 
     def main(self) -> None:
+        # Start generating boards before pygame is initialised, so the worker process doesn't inherit any of it
+        maze_pool = MazePool(BOARD_SIZE)
+        maze_pool.start()
+        export_path = profiler.export_path()
+        if export_path is not None:
+            self.profiler.enable()
+        try:
+            self.run(maze_pool)
+        finally:
+            maze_pool.close()
+            if export_path is not None:
+                self.profiler.export(export_path)
+
+    def run(self, maze_pool: MazePool) -> None:
         pygame.init()
         pygame.display.set_caption(f'DARKNESS: THE ESCAPE | Version {__version__}')
         canvas = pygame.display.set_mode((self.x_size, self.y_size), WINDOW_FLAGS)
         clock = pygame.time.Clock()
 
-        game = Game(self, canvas)
+        game = Game(self, canvas, maze_pool=maze_pool)
         game.display_menu()
 
+        step_seconds = 1 / self.TPS
+        accumulator = 0.0
+        last_time = time.perf_counter()
         while True:
-            self.number_tick += 1
-            pygame.display.update()
-            clock.tick(self.TPS)
+            # Looked up every frame, since F3 swaps them between the real ones and no-ops
+            mark = self.profiler.mark
+            dirty_rects = game.take_dirty_rects()
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+            mark(profiler.DISPLAY)
+            clock.tick(self.IDLE_TPS if game.idle else self.MAX_FPS)
+            mark(profiler.WAIT)
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     pygame.quit()
@@ -51,8 +82,39 @@ class Main:
                 if event.type == pygame.VIDEORESIZE:
                     self.x_size = event.w
                     self.y_size = event.h
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.toggle_perf_overlay(game)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                    game.toggle_fog()
                 game.handle_event(event)
-            game.tick_loop()
+            mark(profiler.EVENTS)
+
+            now = time.perf_counter()
+            if game.idle:
+                # Nothing to simulate, and the next game shouldn't start with a backlog of steps
+                accumulator = 0.0
+            else:
+                accumulator += now - last_time
+            last_time = now
+            steps = 0
+            while accumulator >= step_seconds and steps < self.MAX_CATCH_UP_STEPS:
+                self.number_tick += 1
+                game.tick_loop()
+                accumulator -= step_seconds
+                steps += 1
+            if steps == self.MAX_CATCH_UP_STEPS:
+                accumulator = min(accumulator, step_seconds)
+            game.draw_frame(accumulator / step_seconds)
+            self.profiler.end_frame()
+
+    def toggle_perf_overlay(self, game: Game) -> None:
+        game.show_perf_overlay = not game.show_perf_overlay
+        if game.show_perf_overlay:
+            if not self.profiler.enabled:
+                self.profiler.enable()
+        elif profiler.export_path() is None:
+            self.profiler.disable()
+        game.mark_full_redraw()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,152 @@
+"""Measures a board, to pick mazes of the right difficulty without playing them.
+
+:func:`analyze` makes one linear pass over the connection masks, joining connected cells in a union-find and
+counting dead ends, edges and dark cells. Then one BFS from the exit gives every cell's distance to it.
+:func:`generate_until` keeps calling :func:`generator.fill` until a board passes a test on those numbers.
+"""
+
+from __future__ import annotations
+
+import random
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from mazegen import generator
+from mazegen.game_structures import Board, D
+
+DEFAULT_MAX_ATTEMPTS = 100
+
+
+@dataclass
+class MazeStats:
+    size: int
+    # Number of separate regions; a playable maze has exactly one
+    components: int
+    dead_ends: int
+    # Edges beyond a spanning tree of the cells, i.e. how many independent loops there are
+    loops: int
+    # Share of cells drawn in the darkest grey (Node.is_darkest)
+    darkest_share: float
+    # distance_histogram[d] is the number of cells d steps from the exit; unreachable cells aren't counted
+    distance_histogram: list[int]
+
+    @property
+    def connected(self) -> bool:
+        return self.components == 1
+
+    @property
+    def max_exit_distance(self) -> int:
+        """The longest shortest path to the exit from any reachable cell."""
+        return len(self.distance_histogram) - 1
+
+    @property
+    def mean_exit_distance(self) -> float:
+        reachable = sum(self.distance_histogram)
+        return sum(d * count for d, count in enumerate(self.distance_histogram)) / reachable
+
+
+def _find(parents: array, cell: int) -> int:
+    while parents[cell] != cell:
+        parents[cell] = parents[parents[cell]]  # path halving
+        cell = parents[cell]
+    return cell
+
+
+def analyze(board: Board) -> MazeStats:
+    size = board.size
+    masks = board.masks
+    powers = board.powers
+    cells = size * size
+    parents = array('i', range(cells))
+    components = cells
+    edges = 0
+    dead_ends = 0
+    darkest = 0
+    for cell in range(cells):
+        mask = masks[cell]
+        if mask in (1, 2, 4, 8):  # exactly one connection
+            dead_ends += 1
+        if powers[cell] < 1:  # same as Node.is_darkest
+            darkest += 1
+        # Every edge is seen from both ends; only count it from the left or upper one
+        for d, neighbor in ((D.RIGHT, cell + size), (D.DOWN, cell + 1)):
+            if not mask >> d & 1:
+                continue
+            edges += 1
+            root = _find(parents, cell)
+            other = _find(parents, neighbor)
+            if root != other:
+                parents[root] = other
+                components -= 1
+    return MazeStats(
+        size=size,
+        components=components,
+        dead_ends=dead_ends,
+        loops=edges - (cells - components),
+        darkest_share=darkest / cells,
+        distance_histogram=exit_distance_histogram(board),
+    )
+
+
+def exit_distance_histogram(board: Board) -> list[int]:
+    size = board.size
+    masks = board.masks
+    distances = array('i', [-1]) * (size * size)
+    exit_cell = board.maze_exit_x * size + board.maze_exit_y
+    distances[exit_cell] = 0
+    histogram = [1]
+    offsets = [-size, size, -1, 1]  # cell index delta for each direction, in D order
+    queue = [exit_cell]
+    for cell in queue:  # the list grows while we iterate over it
+        mask = masks[cell]
+        distance = distances[cell] + 1
+        for d in (D.LEFT, D.RIGHT, D.UP, D.DOWN):
+            if mask >> d & 1:
+                neighbor = cell + offsets[d]
+                if distances[neighbor] == -1:
+                    distances[neighbor] = distance
+                    if distance == len(histogram):
+                        histogram.append(0)
+                    histogram[distance] += 1
+                    queue.append(neighbor)
+    return histogram
+
+
+@dataclass
+class Criteria:
+    """Bounds on a board's stats; None means no bound. Call it with a MazeStats to check them."""
+    min_max_exit_distance: Optional[int] = None
+    max_max_exit_distance: Optional[int] = None
+    min_dead_ends: Optional[int] = None
+    max_dead_ends: Optional[int] = None
+    min_loops: Optional[int] = None
+    max_loops: Optional[int] = None
+    min_darkest_share: Optional[float] = None
+    max_darkest_share: Optional[float] = None
+
+    def __call__(self, stats: MazeStats) -> bool:
+        if not stats.connected:
+            return False
+        for name in ('max_exit_distance', 'dead_ends', 'loops', 'darkest_share'):
+            value = getattr(stats, name)
+            low = getattr(self, f'min_{name}')
+            high = getattr(self, f'max_{name}')
+            if low is not None and value < low or high is not None and value > high:
+                return False
+        return True
+
+
+def generate_until(size: int, accept: Callable[[MazeStats], bool], rng: random.Random = random,
+                   max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> tuple[Board, MazeStats]:
+    """Fills boards until one is accepted (for example by a :class:`Criteria`) and returns it with its stats.
+
+    Raises RuntimeError if none of ``max_attempts`` boards is accepted.
+    """
+    for _ in range(max_attempts):
+        board = Board()
+        generator.fill_seeded(board, size, rng.getrandbits(63))
+        stats = analyze(board)
+        if accept(stats):
+            return board, stats
+    raise RuntimeError(f'no board out of {max_attempts} met the criteria')
@@ -0,0 +1,240 @@
+"""A board too big to generate up front: its cells are generated in square chunks the first time they're read.
+
+The world is ``world_chunks`` x ``world_chunks`` chunks of ``chunk_size`` x ``chunk_size`` cells. Everything about
+a chunk is derived from the world seed and the chunk's coordinates, so a chunk that was evicted comes back exactly
+the same:
+
+- Inside a chunk, :func:`generator.carve` makes the maze, rooted at the exit in the exit's chunk.
+- Each border between two chunks gets one to three openings, picked from a seed for that border, which both
+  chunks agree on. Every chunk is connected inside, so the whole world is connected.
+- Power doesn't depend on walls, only on distance from the exit, and it always dies out long before POWER_RADIUS
+  cells. It is spread once, over the square of that radius around the exit; everything outside it is 0.
+
+Only ``capacity`` chunks are kept in memory, least recently used first out. An evicted chunk is regenerated when
+it's read again, which loses powers changed with :meth:`ChunkedBoard.set_power`. With a ``spill_dir``, chunks with
+such changes are written there on eviction (in the :mod:`mazegen.mazefile` format) and read back instead of
+regenerated. Unchanged chunks are never written, so the directory only grows with the chunks that were changed.
+The files are left behind for a board made later with the same seed and directory;
+:meth:`ChunkedBoard.remove_spilled` deletes the ones this board wrote.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+from mazegen import generator, mazefile
+from mazegen.game_structures import Board, D
+
+DEFAULT_CHUNK_SIZE = 32
+DEFAULT_WORLD_CHUNKS = 4096  # 131072 x 131072 cells
+DEFAULT_CAPACITY = 256  # chunks; about 0.5 MB at 32 x 32
+POWER_RADIUS = 96
+FLOW_RADIUS = 48
+MAX_EXTRA_OPENINGS = 2
+EXTRA_OPENING_CHANCE = 0.5
+
+
+class Chunk:
+    __slots__ = ('masks', 'powers', 'dirty')
+
+    def __init__(self, masks: bytearray, powers: array):
+        self.masks = masks  # indexed local_x * chunk_size + local_y, like a Board
+        self.powers = powers
+        # Powers changed since the chunk was generated or last spilled, which eviction has to write out to keep
+        self.dirty = False
+
+
+class _ChunkedPlane:
+    """``board.masks`` or ``board.powers`` of a ChunkedBoard: read-only, indexed ``x * size + y`` like a Board's."""
+    __slots__ = ('board', 'attribute')
+
+    def __init__(self, board: ChunkedBoard, attribute: str):
+        self.board = board
+        self.attribute = attribute
+
+    def __len__(self) -> int:
+        return self.board.size * self.board.size
+
+    def __getitem__(self, i: int) -> int:
+        board = self.board
+        if not 0 <= i < board.size * board.size:
+            raise IndexError(i)
+        x, y = divmod(i, board.size)
+        chunk_size = board.chunk_size
+        chunk = board.chunk(x // chunk_size, y // chunk_size)
+        return getattr(chunk, self.attribute)[x % chunk_size * chunk_size + y % chunk_size]
+
+
+class ChunkedBoard(Board):
+    """A :class:`Board` whose cells are generated and evicted chunk by chunk.
+
+    The exit is somewhere in the ``exit_within`` x ``exit_within`` cells at the top left of the world.
+    """
+    flow_radius = FLOW_RADIUS
+
+    def __init__(self, seed: int, exit_within: int, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 world_chunks: int = DEFAULT_WORLD_CHUNKS, capacity: int = DEFAULT_CAPACITY,
+                 spill_dir: Optional[str] = None):
+        super().__init__()
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.world_chunks = world_chunks
+        self.size = chunk_size * world_chunks
+        self.capacity = capacity
+        self.spill_dir = spill_dir
+        self.spilled: set[tuple[int, int]] = set()
+        self.chunks: OrderedDict[tuple[int, int], Chunk] = OrderedDict()
+        rng = self._rng('exit')
+        self.maze_exit_x = rng.randrange(min(exit_within, self.size))
+        self.maze_exit_y = rng.randrange(min(exit_within, self.size))
+        self.masks = _ChunkedPlane(self, 'masks')
+        self.powers = _ChunkedPlane(self, 'powers')
+        self.power_origin_x, self.power_origin_y, self.power_window = self._spread_power()
+
+    def _rng(self, *key) -> random.Random:
+        # String seeds go through SHA-512, so neighbouring keys give unrelated streams, and it's stable across runs
+        return random.Random(':'.join(str(part) for part in (self.seed, *key)))
+
+    def reset(self, size: int) -> None:
+        raise TypeError('a chunked board generates itself')
+
+    def set_power(self, x: int, y: int, power: int) -> None:
+        chunk_size = self.chunk_size
+        chunk = self.chunk(x // chunk_size, y // chunk_size)
+        chunk.powers[x % chunk_size * chunk_size + y % chunk_size] = power
+        chunk.dirty = True
+        for listener in self.power_listeners:
+            listener(x, y)
+
+    # Power
+
+    def _spread_power(self) -> tuple[int, int, Board]:
+        side = min(2 * POWER_RADIUS + 1, self.size)
+        origin_x = min(max(0, self.maze_exit_x - POWER_RADIUS), self.size - side)
+        origin_y = min(max(0, self.maze_exit_y - POWER_RADIUS), self.size - side)
+        window = Board()
+        window.reset(side)
+        window.maze_exit_x = self.maze_exit_x - origin_x
+        window.maze_exit_y = self.maze_exit_y - origin_y
+        generator.spread_power(window, self._rng('power'))
+        return origin_x, origin_y, window
+
+    def _chunk_powers(self, cx: int, cy: int) -> array:
+        chunk_size = self.chunk_size
+        powers = array('b', [0]) * (chunk_size * chunk_size)
+        window = self.power_window
+        # The overlap of the chunk and the power window, in window coordinates
+        x_first = max(0, cx * chunk_size - self.power_origin_x)
+        x_last = min(window.size, (cx + 1) * chunk_size - self.power_origin_x)
+        y_first = max(0, cy * chunk_size - self.power_origin_y)
+        y_last = min(window.size, (cy + 1) * chunk_size - self.power_origin_y)
+        for wx in range(x_first, x_last):
+            local_x = wx + self.power_origin_x - cx * chunk_size
+            for wy in range(y_first, y_last):
+                local_y = wy + self.power_origin_y - cy * chunk_size
+                powers[local_x * chunk_size + local_y] = window.powers[wx * window.size + wy]
+        return powers
+
+    # Generation
+
+    def border_openings(self, horizontal: bool, bx: int, by: int) -> list[int]:
+        """Where the border after chunk (bx, by) is open, as offsets along it.
+
+        ``horizontal`` is the border between (bx, by) and (bx + 1, by), otherwise it's the one between (bx, by) and
+        (bx, by + 1). An opening is never put next to the exit, which keeps the exit free of loops.
+        """
+        chunk_size = self.chunk_size
+        rng = self._rng('border', 'x' if horizontal else 'y', bx, by)
+        count = 1 + sum(rng.random() < EXTRA_OPENING_CHANCE for _ in range(MAX_EXTRA_OPENINGS))
+        offsets = rng.sample(range(chunk_size), min(count, chunk_size))
+
+        def touches_exit(offset: int) -> bool:
+            if horizontal:
+                near = ((bx + 1) * chunk_size - 1, by * chunk_size + offset)
+                far = ((bx + 1) * chunk_size, by * chunk_size + offset)
+            else:
+                near = (bx * chunk_size + offset, (by + 1) * chunk_size - 1)
+                far = (bx * chunk_size + offset, (by + 1) * chunk_size)
+            return (self.maze_exit_x, self.maze_exit_y) in (near, far)
+
+        allowed = [offset for offset in offsets if not touches_exit(offset)]
+        if not allowed:
+            allowed = [(offsets[0] + 1) % chunk_size]
+        return allowed
+
+    def generate_chunk(self, cx: int, cy: int) -> Chunk:
+        chunk_size = self.chunk_size
+        rng = self._rng('chunk', cx, cy)
+        exit_cx, exit_cy = self.maze_exit_x // chunk_size, self.maze_exit_y // chunk_size
+        if (cx, cy) == (exit_cx, exit_cy):
+            root = self.maze_exit_x % chunk_size * chunk_size + self.maze_exit_y % chunk_size
+        else:
+            root = rng.randrange(chunk_size * chunk_size)
+        masks = generator.carve(chunk_size, root, rng)
+        last = chunk_size - 1
+        if cx > 0:
+            for offset in self.border_openings(True, cx - 1, cy):
+                masks[offset] |= 1 << D.LEFT
+        if cx < self.world_chunks - 1:
+            for offset in self.border_openings(True, cx, cy):
+                masks[last * chunk_size + offset] |= 1 << D.RIGHT
+        if cy > 0:
+            for offset in self.border_openings(False, cx, cy - 1):
+                masks[offset * chunk_size] |= 1 << D.UP
+        if cy < self.world_chunks - 1:
+            for offset in self.border_openings(False, cx, cy):
+                masks[offset * chunk_size + last] |= 1 << D.DOWN
+        return Chunk(masks, self._chunk_powers(cx, cy))
+
+    # Storage
+
+    def _spill_path(self, cx: int, cy: int) -> str:
+        return os.path.join(self.spill_dir, f'{self.seed}_{cx}_{cy}.dkmz')
+
+    def _spill(self, key: tuple[int, int], chunk: Chunk) -> None:
+        record = Board()
+        record.size = self.chunk_size
+        record.masks = chunk.masks
+        record.powers = chunk.powers
+        record.maze_exit_x = record.maze_exit_y = 0
+        mazefile.save(record, self._spill_path(*key))
+        self.spilled.add(key)
+        chunk.dirty = False
+
+    def _unspill(self, cx: int, cy: int) -> Optional[Chunk]:
+        path = self._spill_path(cx, cy)
+        if not os.path.exists(path):
+            return None
+        record = mazefile.load(path)
+        return Chunk(record.masks, record.powers)
+
+    def remove_spilled(self) -> None:
+        """Deletes the chunk files this board spilled. Changed powers in chunks that aren't in memory are lost."""
+        for key in self.spilled:
+            try:
+                os.remove(self._spill_path(*key))
+            except FileNotFoundError:
+                pass
+        self.spilled.clear()
+
+    def chunk(self, cx: int, cy: int) -> Chunk:
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+        if not (0 <= cx < self.world_chunks and 0 <= cy < self.world_chunks):
+            raise IndexError(f'chunk {key} is outside the world')
+        chunk = self._unspill(cx, cy) if self.spill_dir is not None else None
+        if chunk is None:
+            chunk = self.generate_chunk(cx, cy)
+        self.chunks[key] = chunk
+        while len(self.chunks) > self.capacity:
+            evicted_key, evicted = self.chunks.popitem(last=False)
+            if self.spill_dir is not None and evicted.dirty:
+                self._spill(evicted_key, evicted)
+        return chunk
@@ -0,0 +1,159 @@
+"""Wall geometry and swept collision for the player.
+
+A cell's walls only depend on its connection mask, so the boxes for all 16 masks are built once, already grown by
+PLAYER_SIZE on every side, and stored in one flat array. Colliding the player's square with a wall then becomes
+colliding its centre point with the grown box, and the time of impact along a movement is found analytically with
+the slab test instead of by trial and error.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Optional
+
+import game
+from mazegen.game_structures import Board, D
+
+NO_HIT = -1
+AXIS_X = 0
+AXIS_Y = 1
+
+# _templates[0] is a flat array of (x_min, x_max, y_min, y_max) boxes relative to the cell's corner, and
+# _templates[1][mask] is the (start, end) slice of it holding that mask's boxes
+_templates: Optional[tuple[array, list[tuple[int, int]]]] = None
+
+
+def cell_walls(mask: int) -> list[tuple[int, int, int, int]]:
+    """The walls of a cell with this connection mask, relative to its top-left corner.
+
+    A closed side is one wall across the whole cell; an open side leaves a gap between two stubs of
+    OPENING_BUFFER_SIZE at its ends. These are the same boxes the legacy do_physics checks.
+    """
+    size = game.CELL_SIZE
+    thickness = game.THICKNESS
+    buffer = game.OPENING_BUFFER_SIZE
+    walls = []
+    for near in (True, False):
+        line = 0 if near else size
+        # Vertical walls (left and right sides)
+        if mask & (1 << (D.LEFT if near else D.RIGHT)):
+            walls.append((line - thickness, line + thickness, 0, buffer))
+            walls.append((line - thickness, line + thickness, size - buffer, size))
+        else:
+            walls.append((line - thickness, line + thickness, 0, size))
+        # Horizontal walls (top and bottom sides)
+        if mask & (1 << (D.UP if near else D.DOWN)):
+            walls.append((0, buffer, line - thickness, line + thickness))
+            walls.append((size - buffer, size, line - thickness, line + thickness))
+        else:
+            walls.append((0, size, line - thickness, line + thickness))
+    return walls
+
+
+def _build_templates() -> tuple[array, list[tuple[int, int]]]:
+    grow = game.PLAYER_SIZE
+    boxes = array('d')
+    slices = []
+    for mask in range(16):
+        start = len(boxes)
+        for x_min, x_max, y_min, y_max in cell_walls(mask):
+            boxes.extend((x_min - grow, x_max + grow, y_min - grow, y_max + grow))
+        slices.append((start, len(boxes)))
+    return boxes, slices
+
+
+class WallGeometry:
+    """The walls of one board, ready for :meth:`move`. Build it once after generator.fill."""
+
+    def __init__(self, board: Board):
+        global _templates
+        if _templates is None:
+            _templates = _build_templates()
+        self.board = board
+        self.boxes, self.slices = _templates
+
+    def sweep(self, cell_x: int, cell_y: int, x: float, y: float, dx: float, dy: float
+              ) -> tuple[float, int, float]:
+        """The first wall of the cell hit when moving the point (x, y) by (dx, dy).
+
+        Returns (time of impact in [0, 1), AXIS_X or AXIS_Y, the coordinate the point stops at on that axis), or
+        (1.0, NO_HIT, 0.0) if nothing is in the way. Boxes are open, so a point resting against a wall can slide
+        along it or move away from it; a box the point already starts inside is ignored.
+        """
+        origin_x = cell_x * game.CELL_SIZE
+        origin_y = cell_y * game.CELL_SIZE
+        x -= origin_x
+        y -= origin_y
+        boxes = self.boxes
+        start, end = self.slices[self.board.masks[cell_x * self.board.size + cell_y]]
+        best_t = 1.0
+        best_axis = NO_HIT
+        best_plane = 0.0
+        for i in range(start, end, 4):
+            x_min = boxes[i]
+            x_max = boxes[i + 1]
+            y_min = boxes[i + 2]
+            y_max = boxes[i + 3]
+            if dx > 0:
+                tx_enter = (x_min - x) / dx
+                tx_exit = (x_max - x) / dx
+            elif dx < 0:
+                tx_enter = (x_max - x) / dx
+                tx_exit = (x_min - x) / dx
+            elif x_min < x < x_max:
+                tx_enter = -math.inf
+                tx_exit = math.inf
+            else:
+                continue
+            if dy > 0:
+                ty_enter = (y_min - y) / dy
+                ty_exit = (y_max - y) / dy
+            elif dy < 0:
+                ty_enter = (y_max - y) / dy
+                ty_exit = (y_min - y) / dy
+            elif y_min < y < y_max:
+                ty_enter = -math.inf
+                ty_exit = math.inf
+            else:
+                continue
+            if tx_enter >= ty_enter:
+                enter, axis = tx_enter, AXIS_X
+            else:
+                enter, axis = ty_enter, AXIS_Y
+            if enter < 0 or enter >= best_t or enter >= min(tx_exit, ty_exit):
+                continue
+            best_t = enter
+            best_axis = axis
+            if axis == AXIS_X:
+                best_plane = origin_x + (x_min if dx > 0 else x_max)
+            else:
+                best_plane = origin_y + (y_min if dy > 0 else y_max)
+        return best_t, best_axis, best_plane
+
+    def move(self, x: float, y: float, dx: float, dy: float) -> tuple[float, float, bool, bool]:
+        """Moves the player's centre by (dx, dy), sliding along whatever wall it runs into.
+
+        Returns the new position and whether the movement along x and along y was blocked.
+        """
+        cell_x = int(x / game.CELL_SIZE)
+        cell_y = int(y / game.CELL_SIZE)
+        blocked_x = blocked_y = False
+        # Two passes at most: after the first hit, one axis is blocked and only the other one is left to slide on
+        for _ in range(2):
+            t, axis, plane = self.sweep(cell_x, cell_y, x, y, dx, dy)
+            if axis == NO_HIT:
+                return x + dx, y + dy, blocked_x, blocked_y
+            if axis == AXIS_X:
+                x = plane
+                y += dy * t
+                dx = 0.0
+                dy *= 1 - t
+                blocked_x = True
+            else:
+                x += dx * t
+                y = plane
+                dx *= 1 - t
+                dy = 0.0
+                blocked_y = True
+        return x, y, blocked_x, blocked_y
@@ -1,7 +1,12 @@
 """Data structures and stuff for the game."""
 
+from __future__ import annotations
+
 import dataclasses
+import random
+from array import array
 from dataclasses import dataclass
+from typing import Callable, ClassVar, Optional
 
 
 class D:
@@ -11,55 +16,197 @@ class D:
     DOWN = 3
 
 
-@dataclass
+# OPPOSITE[d] is the direction pointing back across an edge leaving in direction d
+OPPOSITE = [D.RIGHT, D.LEFT, D.DOWN, D.UP]
+
+
+class Connections:
+    """View of one cell's connection mask that indexes like the old ``[left, right, up, down]`` list."""
+    __slots__ = ('masks', 'index')
+
+    def __init__(self, masks: bytearray, index: int):
+        self.masks = masks
+        self.index = index
+
+    def __getitem__(self, direction: int) -> bool:
+        return bool(self.masks[self.index] >> direction & 1)
+
+    def __setitem__(self, direction: int, value: bool) -> None:
+        if value:
+            self.masks[self.index] |= 1 << direction
+        else:
+            self.masks[self.index] &= ~(1 << direction) & 0xf
+
+    def __len__(self) -> int:
+        return 4
+
+    def __iter__(self):
+        mask = self.masks[self.index]
+        return iter([bool(mask >> d & 1) for d in range(4)])
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def power_color(power: int) -> int:
+    if power >= 4:  # 4~6
+        return 0xa0a0a0
+    if power >= 1:  # 1~3
+        return 0x808080
+    return 0x606060
+
+
 class Node:
-    x: int
-    y: int
-    connections: list[bool, bool, bool, bool] = dataclasses.field(init=False, default_factory=lambda: [False, False, False, False])
-    power: int = dataclasses.field(init=False, default=-1)
+    """Lightweight view of a single cell. The actual data lives in the flat arrays of its :class:`Board`."""
+    __slots__ = ('board', 'x', 'y')
+
+    def __init__(self, board: Board, x: int, y: int):
+        self.board = board
+        self.x = x
+        self.y = y
+
+    @property
+    def connections(self) -> Connections:
+        return Connections(self.board.masks, self.x * self.board.size + self.y)
+
+    @property
+    def power(self) -> int:
+        return self.board.powers[self.x * self.board.size + self.y]
+
+    @power.setter
+    def power(self, value: int) -> None:
+        self.board.set_power(self.x, self.y, value)
 
     def tuple(self) -> tuple[int, int]:
         return self.x, self.y
 
     def color(self) -> int:
-        if self.power >= 4:  # 4~6
-            return 0xa0a0a0
-        if self.power >= 1:  # 1~3
-            return 0x808080
-        return 0x606060
+        return power_color(self.power)
 
     def is_darkest(self) -> bool:
         return self.color() == 0x606060
 
+    def __eq__(self, other):
+        return isinstance(other, Node) and self.board is other.board and self.x == other.x and self.y == other.y
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
     def __repr__(self):
         return f'Node({self.x}, {self.y})'
 
 
-@dataclass(frozen=True)
-class Edge:
-    """Represents an edge. This class is redundant during actual gameplay and only matters during generation."""
-    node1: Node
-    node2: Node
+class _Column:
+    """``board.board[x]``, indexable by y."""
+    __slots__ = ('board', 'x')
 
-    def tuple(self) -> tuple:
-        return self.node1.x, self.node1.y, self.node2.x, self.node2.y
+    def __init__(self, board: Board, x: int):
+        self.board = board
+        self.x = x
 
-    def __eq__(self, other):
-        return self.node1 == other.node1 and self.node2 == other.node2
+    def __getitem__(self, y: int) -> Node:
+        if not 0 <= y < self.board.size:
+            raise IndexError(f'y={y} is out of range')
+        return Node(self.board, self.x, y)
 
-    def __hash__(self):
-        return hash(self.tuple())
+    def __len__(self) -> int:
+        return self.board.size
 
-    def __repr__(self):
-        return f'Edge({self.node1}, {self.node2})'
+    def __iter__(self):
+        return (Node(self.board, self.x, y) for y in range(self.board.size))
+
+
+class _Grid:
+    """``board.board``, indexable by x."""
+    __slots__ = ('board',)
+
+    def __init__(self, board: Board):
+        self.board = board
+
+    def __getitem__(self, x: int) -> _Column:
+        if not 0 <= x < self.board.size:
+            raise IndexError(f'x={x} is out of range')
+        return _Column(self.board, x)
+
+    def __len__(self) -> int:
+        return self.board.size
+
+    def __iter__(self):
+        return (_Column(self.board, x) for x in range(self.board.size))
+
+
+class Frontier:
+    """Set of ints that supports O(1) add, membership and uniform random removal.
+
+    Items live in a plain list; removing one swaps the last item into its slot, and ``positions`` maps each item
+    back to its slot so that lookups never have to scan.
+    """
+    __slots__ = ('items', 'positions')
+
+    def __init__(self):
+        self.items: list[int] = []
+        self.positions: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, item: int) -> bool:
+        return item in self.positions
+
+    def add(self, item: int) -> None:
+        if item in self.positions:
+            return
+        self.positions[item] = len(self.items)
+        self.items.append(item)
+
+    def pop_random(self, rng: random.Random) -> int:
+        """Remove and return a uniformly random item."""
+        if not self.items:
+            raise RuntimeError('you attempted this with an empty frontier')
+        items = self.items
+        i = int(rng.random() * len(items))
+        item = items[i]
+        last = items.pop()
+        if last != item:
+            items[i] = last
+            self.positions[last] = i
+        del self.positions[item]
+        return item
 
 
 @dataclass
 class Board:
-    board: list[list[Node]] = dataclasses.field(init=False)
+    """The maze, stored as flat arrays indexed by ``x * size + y``.
+
+    ``masks`` holds a 4-bit connection mask per cell (bit ``d`` set means connected in direction ``d``) and
+    ``powers`` holds a signed byte per cell. ``board[x][y]`` hands out :class:`Node` views over them.
+
+    Anything that caches what a cell looks like can register in ``power_listeners``; each listener gets called with
+    (x, y) whenever :meth:`set_power` changes a cell. Writing to ``powers`` directly skips the listeners, which is
+    only meant for generation.
+    """
+    size: int = dataclasses.field(init=False, default=0)
+    masks: bytearray = dataclasses.field(init=False, default_factory=bytearray)
+    powers: array = dataclasses.field(init=False, default_factory=lambda: array('b'))
     maze_exit_x: int = dataclasses.field(init=False)
     maze_exit_y: int = dataclasses.field(init=False)
-
-    def get_edge(self, x1: int, y1: int, x2: int, y2: int):
-        """Convenience method to get an edge."""
-        return Edge(self.board[x1][y1], self.board[x2][y2])
+    seed: Optional[int] = dataclasses.field(init=False, default=None)  # what the board was generated from, if known
+    power_listeners: list[Callable[[int, int], None]] = dataclasses.field(init=False, default_factory=list)
+    # How far from their target flow fields search by default; None searches the whole board
+    flow_radius: ClassVar[Optional[int]] = None
+
+    def reset(self, size: int) -> None:
+        """Allocate an empty (unconnected, unpowered) board of the given size."""
+        self.size = size
+        self.masks = bytearray(size * size)
+        self.powers = array('b', [-1]) * (size * size)
+        self.seed = None
+
+    def set_power(self, x: int, y: int, power: int) -> None:
+        self.powers[x * self.size + y] = power
+        for listener in self.power_listeners:
+            listener(x, y)
+
+    @property
+    def board(self) -> _Grid:
+        return _Grid(self)
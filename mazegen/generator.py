@@ -3,107 +3,174 @@
 from __future__ import annotations
 
 import random
+from array import array
+from typing import Optional
 
 import util
-from mazegen.game_structures import Board, D, Edge, Node
+from mazegen.game_structures import OPPOSITE, Board, D, Frontier, Node
 
 
-def edge_set_choice(the_set: set[Edge]) -> Edge:
-    currently_selected = None
-    if len(the_set) == 0:
-        raise RuntimeError('you attempted this with an empty set')
-    for i, item in enumerate(the_set):
-        if random.random() < 1 / (i+1):
-            currently_selected = item
-    assert currently_selected is not None
-    return currently_selected
+# Chance to skip an edge that would close a loop (higher makes the game harder by reducing the number of open edges)
+LOOP_SKIP_CHANCE = 0.885
 
 
-def fill(board: Board, size: int):
-    """Fill the board."""
-    # Initialization
-    board.board = [[Node(x, y) for y in range(size)] for x in range(size)]
-    board_edges: list[tuple[int, int, int, int]] = []
-    visited_nodes: set[tuple[int, int]] = set()  # We are NOT using :Node:s here because they're mutable and unhashable
-    available_edges: set[Edge] = set()
-    root_node = board.board[random.randrange(size)][random.randrange(size)]
-    board.maze_exit_x = root_node.x
-    board.maze_exit_y = root_node.y
-    visited_nodes.add(root_node.tuple())
-    for dx, dy in zip(util.D_X, util.D_Y):
-        x1 = root_node.x + dx
-        y1 = root_node.y + dy
-        if x1 < 0 or y1 < 0 or x1 >= size or y1 >= size:  # edge leads to a nonexistent place
-            continue
-        available_edges.add(board.get_edge(root_node.x, root_node.y, x1, y1))
+def carve(size: int, root: int, rng: random.Random = random, height: Optional[int] = None) -> bytearray:
+    """Carve a maze into a flat grid of connection masks, growing outwards from the root cell.
 
-    while True:
-        # Get edge
-        next_edge = edge_set_choice(available_edges)
-        available_edges.remove(next_edge)
+    Cells are numbered ``x * height + y`` and bit ``d`` of ``masks[cell]`` is set when the cell is connected in
+    direction ``d``. The grid is ``size`` wide and ``height`` (by default also ``size``) tall. Directed edges are
+    encoded as ``cell * 4 + d`` and kept in a :class:`Frontier`, so picking a random edge and checking whether an
+    edge is already carved are both O(1).
+    """
+    width = size
+    if height is None:
+        height = size
+    cells = width * height
+    masks = bytearray(cells)
+    visited = bytearray(cells)
+    offsets = [-height, height, -1, 1]  # cell index delta for each direction, in D order
+    frontier = Frontier()
+    add = frontier.add
+
+    def add_edges(cell: int) -> None:
+        x, y = divmod(cell, height)
+        mask = masks[cell]
+        if x > 0 and not mask & 1:  # 1 << D.LEFT
+            add(cell*4 + D.LEFT)
+        if x < width-1 and not mask & 2:  # 1 << D.RIGHT
+            add(cell*4 + D.RIGHT)
+        if y > 0 and not mask & 4:  # 1 << D.UP
+            add(cell*4 + D.UP)
+        if y < height-1 and not mask & 8:  # 1 << D.DOWN
+            add(cell*4 + D.DOWN)
+
+    visited[root] = 1
+    visited_count = 1
+    add_edges(root)
+    pop_random = frontier.pop_random
+    while visited_count < cells:
+        # Get edge; the cell it leaves from has always been visited
+        edge = pop_random(rng)
+        cell, d = edge >> 2, edge & 3
+        other = cell + offsets[d]
         # Potentially quit if the edge is connected (redundant)
-        if next_edge.node1.tuple() in visited_nodes and next_edge.node2.tuple() in visited_nodes:
+        if visited[other]:
             # if it's a redundant edge including the root node, always skip
             # note that this doesn't mean there's only one path to the exit, because a non-redundant edge
             #   could have been added naturally
-            if next_edge.node1.tuple() == root_node.tuple() or next_edge.node2.tuple() == root_node.tuple():
+            if cell == root or other == root:
                 continue
             # normal loop/cycle, percentage to skip
-            if random.random() <= 0.885:  # (higher makes the game harder by reducing the number of open edges)
+            if rng.random() <= LOOP_SKIP_CHANCE:
                 continue
-        if next_edge.node1.tuple() in visited_nodes:
-            unvisited_node = next_edge.node2
-        elif next_edge.node1.tuple() in visited_nodes:
-            unvisited_node = next_edge.node1
         else:
-            raise RuntimeError('at least one of the nodes in an edge must be visited')
+            visited[other] = 1
+            visited_count += 1
         # Update
-        visited_nodes.add(unvisited_node.tuple())
-        board_edges.append(next_edge.tuple())
-        for dx, dy in zip(util.D_X, util.D_Y):
-            x1 = unvisited_node.x + dx
-            y1 = unvisited_node.y + dy
-            if x1 < 0 or y1 < 0 or x1 >= size or y1 >= size:  # edge leads to a nonexistent place
-                continue
-            edge_1_tuple = (unvisited_node.x, unvisited_node.y, x1, y1)
-            edge_2_tuple = (x1, y1, unvisited_node.x, unvisited_node.y)
-            if edge_1_tuple in board_edges or edge_2_tuple in board_edges:  # must account for both orientations
-                continue
-            available_edges.add(board.get_edge(*edge_1_tuple))
-        if len(visited_nodes) == size**2:  # all visited
-            break
-
-    # Set up the nodes with their connections using the edges
-    for x1, y1, x2, y2 in board_edges:
-        if y1 == y2 and x1+1 == x2:
-            board.board[x1][y1].connections[D.RIGHT] = True
-            board.board[x2][y2].connections[D.LEFT] = True
-        elif y1 == y2 and x1-1 == x2:
-            board.board[x1][y1].connections[D.LEFT] = True
-            board.board[x2][y2].connections[D.RIGHT] = True
-        elif x1 == x2 and y1+1 == y2:
-            board.board[x1][y1].connections[D.DOWN] = True
-            board.board[x2][y2].connections[D.UP] = True
-        elif x1 == x2 and y1-1 == y2:
-            board.board[x1][y1].connections[D.UP] = True
-            board.board[x2][y2].connections[D.DOWN] = True
-
-    # Next, we will set the power (color) of each node
-    # This is a weird iterative deepening search.
-    # Algorithm:
-    #   Goal node power is 6; mark as visited
-    #   Add the neighbors to the CURRENT queue
-    #   Loop while CURRENT queue is not empty:
-    #       Shuffle CURRENT queue
-    #       Loop every node in the CURRENT queue:
-    #           Power := max adjacent power - ( 20% chance to subtract 1 ); mark as visited
-    #           If power <= 0: power = 0
-    #           Add neighbors to NEXT queue (if not visited - eventually we will get to all of them)
-    #           Mark as visited
-    #       NEXT queue becomes CURRENT queue
+        masks[cell] |= 1 << d
+        masks[other] |= 1 << OPPOSITE[d]
+        add_edges(other)
+    return masks
+
+
+def fill(board: Board, size: int, rng: random.Random = random):
+    """Fill the board. Pass a seeded ``random.Random`` as ``rng`` to get a reproducible maze."""
+    # Initialization
+    board.reset(size)
+    board.maze_exit_x = rng.randrange(size)
+    board.maze_exit_y = rng.randrange(size)
+    board.masks = carve(size, board.maze_exit_x * size + board.maze_exit_y, rng)
+    spread_power(board, rng)
+
+
+def fill_seeded(board: Board, size: int, seed: int) -> None:
+    """Fill the board from ``seed`` and record it in ``board.seed``, so the board can be saved with the seed."""
+    fill(board, size, random.Random(seed))
+    board.seed = seed
+
+
+# Next, we will set the power (color) of each node
+# This is a weird iterative deepening search.
+# Algorithm:
+#   Goal node power is 6; mark as visited
+#   Add the neighbors to the CURRENT queue
+#   Loop while CURRENT queue is not empty:
+#       Shuffle CURRENT queue
+#       Loop every node in the CURRENT queue:
+#           Power := max adjacent power - ( 51.5% chance to subtract 1 ); mark as visited
+#           If power <= 0: power = 0
+#           Add neighbors to NEXT queue (if not visited - eventually we will get to all of them)
+#           Mark as visited
+#       NEXT queue becomes CURRENT queue
+# Note that a node which is still waiting in the CURRENT queue is not visited yet, so it can also be added to
+# the NEXT queue and get its power recomputed in the next wave.
+EXIT_POWER = 6
+POWER_DROP_CHANCE = 0.515
+
+
+def spread_power(board: Board, rng: random.Random = random) -> None:
+    """Set the power of every node, spreading outwards from the exit one wave at a time.
+
+    Works on the flat arrays of the board. Each wave stamps the nodes it queues in ``queued_in_wave``, so checking
+    whether a neighbor is already in the NEXT queue is O(1) and the whole pass is linear in the number of nodes.
+    Given the same ``rng`` state it produces exactly the same powers as :func:`spread_power_reference`.
+    """
+    size = board.size
+    powers = board.powers
+    visited = bytearray(size * size)
+    queued_in_wave = array('i', [-1]) * (size * size)
+    exit_cell = board.maze_exit_x * size + board.maze_exit_y
+    powers[exit_cell] = EXIT_POWER
+    visited[exit_cell] = 1
+
+    def neighbors(cell: int) -> list[int]:
+        x, y = divmod(cell, size)
+        result = []
+        if x > 0:
+            result.append(cell - size)
+        if x < size-1:
+            result.append(cell + size)
+        if y > 0:
+            result.append(cell - 1)
+        if y < size-1:
+            result.append(cell + 1)
+        return result
+
+    # Add neighbors
+    current_queue = neighbors(exit_cell)
+    wave = 0
+    # Loop
+    while current_queue:
+        rng.shuffle(current_queue)
+        next_queue: list[int] = []
+        for cell in current_queue:
+            adjacent = neighbors(cell)
+            # Power
+            max_neighbor_power = 0
+            for neighbor in adjacent:
+                if visited[neighbor] and powers[neighbor] > max_neighbor_power:
+                    max_neighbor_power = powers[neighbor]
+            powers[cell] = max(0, max_neighbor_power - (1 if rng.random() < POWER_DROP_CHANCE else 0))
+            # Add neighbors
+            for neighbor in adjacent:
+                if visited[neighbor] or queued_in_wave[neighbor] == wave:
+                    continue
+                queued_in_wave[neighbor] = wave
+                next_queue.append(neighbor)
+            visited[cell] = 1
+        current_queue = next_queue
+        wave += 1
+
+
+def spread_power_reference(board: Board, rng: random.Random = random) -> None:
+    """The original node-by-node implementation of :func:`spread_power`.
+
+    It is quadratic in the board size and only kept so the fast version can be checked against it.
+    """
+    size = board.size
     visited_nodes = set()
     exit_node = board.board[board.maze_exit_x][board.maze_exit_y]
-    exit_node.power = 6
+    exit_node.power = EXIT_POWER
     visited_nodes.add(exit_node.tuple())
     # Add neighbors
     current_queue: list[Node] = []
@@ -115,7 +182,7 @@ def fill(board: Board, size: int):
         current_queue.append(board.board[x1][y1])
     # Loop
     while current_queue:
-        random.shuffle(current_queue)
+        rng.shuffle(current_queue)
         next_queue: list[Node] = []
         for node in current_queue:
             # Power
@@ -128,7 +195,7 @@ def fill(board: Board, size: int):
                 neighbor = board.board[x1][y1]
                 if neighbor.tuple() in visited_nodes:
                     max_neighbor_power = max(max_neighbor_power, neighbor.power)
-            node.power = max(0, max_neighbor_power - (1 if random.random() < 0.515 else 0))
+            node.power = max(0, max_neighbor_power - (1 if rng.random() < POWER_DROP_CHANCE else 0))
             # Add neighbors
             for dx, dy in zip(util.D_X, util.D_Y):
                 x1 = node.x + dx
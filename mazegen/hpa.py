@@ -0,0 +1,284 @@
+"""Hierarchical pathfinding (HPA*): the way to the player without searching every cell of the board.
+
+The board is cut into square clusters of ``cluster_size`` x ``cluster_size`` cells. A cell next to an opening in a
+cluster's border is an *entrance*. Once per board, every entrance gets the distance from it to each cell of its
+cluster, without leaving the cluster. That also gives the distances between the entrances of a cluster. Together
+with the openings themselves (distance 1), they make up the abstract graph, which has a few nodes per cluster
+instead of ``cluster_size ** 2``. Two entrances are only linked if the path between them doesn't pass a third.
+
+For a target cell, a Dijkstra search over the abstract graph finds every entrance's distance to the target. It is
+seeded with the distances inside the target's own cluster. Its cost grows with the number of clusters, not cells.
+The first step from a cell then only needs the entrances of the cell's own cluster. Take the one that minimises
+(distance inside the cluster + distance from the entrance) and walk downhill on its distances. Those distances
+are exact, so the steps follow a shortest path, just like a :class:`FlowField` does. On boards with loops, ties
+may be broken differently.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections import OrderedDict
+
+import util
+from mazegen.game_structures import Board, D
+from mazegen.pathfinding import AT_TARGET, NO_PATH
+
+DEFAULT_CLUSTER_SIZE = 16
+UNREACHABLE = 0xffff
+INFINITY = float('inf')
+# HierarchicalTarget.via for an entrance whose shortest path goes straight to the target, inside the cluster
+TO_TARGET = -1
+
+
+class Cluster:
+    __slots__ = ('x', 'y', 'width', 'height', 'masks', 'entrances')
+
+    def __init__(self, x: int, y: int, width: int, height: int, masks: bytearray):
+        self.x = x  # first cell
+        self.y = y
+        self.width = width
+        self.height = height
+        # Masks of the cells, indexed (x - self.x) * height + (y - self.y), without the openings out of the cluster
+        self.masks = masks
+        self.entrances: list[int] = []  # board cell indices
+
+
+def local_distances(cluster: Cluster, start: int) -> array:
+    """Distance from local cell ``start`` to every cell of the cluster, staying inside it."""
+    return _local_search(cluster, start, bytearray(len(cluster.masks)))[0]
+
+
+def _local_search(cluster: Cluster, start: int, stops: bytearray) -> tuple[array, list[int]]:
+    """Like local_distances, also returning the local cells in ``stops`` reached without passing another one."""
+    height = cluster.height
+    masks = cluster.masks
+    offsets = [-height, height, -1, 1]  # local index delta for each direction, in D order
+    distances = array('H', [UNREACHABLE]) * len(masks)
+    # Whether the path found to a cell goes through a stop other than the start
+    through = bytearray(len(masks))
+    distances[start] = 0
+    direct = []
+    queue = [start]
+    for cell in queue:  # the list grows while we iterate over it
+        mask = masks[cell]
+        next_distance = distances[cell] + 1
+        blocked = through[cell] or (stops[cell] and cell != start)
+        for d in (D.LEFT, D.RIGHT, D.UP, D.DOWN):
+            if mask >> d & 1:
+                neighbor = cell + offsets[d]
+                if distances[neighbor] == UNREACHABLE:
+                    distances[neighbor] = next_distance
+                    through[neighbor] = blocked
+                    if stops[neighbor] and not blocked:
+                        direct.append(neighbor)
+                    queue.append(neighbor)
+    return distances, direct
+
+
+def downhill(cluster: Cluster, distances: array, local: int) -> int:
+    """The direction of a neighbour of ``local`` one step closer, by ``distances``, to where they were measured from."""
+    height = cluster.height
+    mask = cluster.masks[local]
+    wanted = distances[local] - 1
+    offsets = [-height, height, -1, 1]
+    for d in (D.LEFT, D.RIGHT, D.UP, D.DOWN):
+        if mask >> d & 1 and distances[local + offsets[d]] == wanted:
+            return d
+    raise AssertionError('distances have no downhill neighbour')
+
+
+class HierarchicalPathfinder:
+    """The precomputed abstract graph of a board, and a least-recently-used cache of targets like FlowFieldCache.
+
+    The board's walls must not change afterwards; power changes don't matter.
+    """
+
+    def __init__(self, board: Board, cluster_size: int = DEFAULT_CLUSTER_SIZE, capacity: int = 16):
+        self.board = board
+        self.cluster_size = cluster_size
+        self.capacity = capacity
+        self.targets: OrderedDict[tuple[int, int], HierarchicalTarget] = OrderedDict()
+        self.clusters_per_side = -(-board.size // cluster_size)
+        self.clusters: list[Cluster] = []
+        # Per entrance (board cell index): distances to its cluster's cells, and the edges of the abstract graph as
+        # (entrance, distance): the entrances across its openings, then the ones of its cluster it links to
+        self.entrance_distances: dict[int, array] = {}
+        self.edges: dict[int, list[tuple[int, int]]] = {}
+        self._build()
+
+    def __len__(self) -> int:
+        """The number of nodes in the abstract graph."""
+        return len(self.entrance_distances)
+
+    def cluster_of(self, x: int, y: int) -> Cluster:
+        return self.clusters[x // self.cluster_size * self.clusters_per_side + y // self.cluster_size]
+
+    def _build(self) -> None:
+        size = self.board.size
+        board_masks = self.board.masks
+        cluster_size = self.cluster_size
+        for cx in range(self.clusters_per_side):
+            for cy in range(self.clusters_per_side):
+                first_x = cx * cluster_size
+                first_y = cy * cluster_size
+                width = min(cluster_size, size - first_x)
+                height = min(cluster_size, size - first_y)
+                masks = bytearray(width * height)
+                cluster = Cluster(first_x, first_y, width, height, masks)
+                for lx in range(width):
+                    x = first_x + lx
+                    for ly in range(height):
+                        y = first_y + ly
+                        cell = x * size + y
+                        mask = board_masks[cell]
+                        inside = mask
+                        # Openings out of the cluster make the cell an entrance, and aren't followed inside it
+                        if mask & 1 and lx == 0:  # 1 << D.LEFT
+                            inside &= ~1
+                            self.edges.setdefault(cell, []).append((cell - size, 1))
+                        if mask & 2 and lx == width - 1:  # 1 << D.RIGHT
+                            inside &= ~2
+                            self.edges.setdefault(cell, []).append((cell + size, 1))
+                        if mask & 4 and ly == 0:  # 1 << D.UP
+                            inside &= ~4
+                            self.edges.setdefault(cell, []).append((cell - 1, 1))
+                        if mask & 8 and ly == height - 1:  # 1 << D.DOWN
+                            inside &= ~8
+                            self.edges.setdefault(cell, []).append((cell + 1, 1))
+                        masks[lx * height + ly] = inside
+                        if cell in self.edges:
+                            cluster.entrances.append(cell)
+                self.clusters.append(cluster)
+                self._connect_entrances(cluster)
+
+    def _connect_entrances(self, cluster: Cluster) -> None:
+        # Only entrances reached without passing another one get an edge. Any other shortest path is made of
+        # those edges, so the search finds the same distances over far fewer edges.
+        stops = bytearray(len(cluster.masks))
+        local_entrances = {self.local(cluster, entrance): entrance for entrance in cluster.entrances}
+        for local in local_entrances:
+            stops[local] = 1
+        for local, entrance in local_entrances.items():
+            distances, direct = _local_search(cluster, local, stops)
+            self.entrance_distances[entrance] = distances
+            self.edges[entrance].extend((local_entrances[other], distances[other]) for other in direct)
+
+    def local(self, cluster: Cluster, cell: int) -> int:
+        x, y = divmod(cell, self.board.size)
+        return (x - cluster.x) * cluster.height + (y - cluster.y)
+
+    def get(self, target_x: int, target_y: int) -> HierarchicalTarget:
+        key = (target_x, target_y)
+        target = self.targets.get(key)
+        if target is not None:
+            self.targets.move_to_end(key)
+            return target
+        target = HierarchicalTarget(self, target_x, target_y)
+        self.targets[key] = target
+        if len(self.targets) > self.capacity:
+            self.targets.popitem(last=False)
+        return target
+
+    def clear(self) -> None:
+        self.targets.clear()
+
+
+class HierarchicalTarget:
+    """Shortest paths to one target cell, answering the same queries as a :class:`FlowField`."""
+
+    def __init__(self, pathfinder: HierarchicalPathfinder, target_x: int, target_y: int):
+        self.pathfinder = pathfinder
+        self.target_x = target_x
+        self.target_y = target_y
+        self.cluster = pathfinder.cluster_of(target_x, target_y)
+        self.target_distances = local_distances(self.cluster, self.pathfinder.local(
+            self.cluster, target_x * pathfinder.board.size + target_y))
+        # Per entrance: distance to the target, and the next node on the way there (or TO_TARGET)
+        self.distance: dict[int, int] = {}
+        self.via: dict[int, int] = {}
+        self._search()
+
+    def _search(self) -> None:
+        # Dijkstra with a bucket per distance: every cost is a small positive integer, so that beats a heap
+        pathfinder = self.pathfinder
+        edges = pathfinder.edges
+        distance = self.distance
+        via = self.via
+        buckets: list[list[int]] = []
+        for entrance in self.cluster.entrances:
+            d = self.target_distances[pathfinder.local(self.cluster, entrance)]
+            if d != UNREACHABLE:
+                distance[entrance] = d
+                via[entrance] = TO_TARGET
+                while len(buckets) <= d:
+                    buckets.append([])
+                buckets[d].append(entrance)
+        d = 0
+        while d < len(buckets):
+            for node in buckets[d]:
+                if distance[node] != d:
+                    continue  # found a shorter way there after it was queued
+                for other, cost in edges[node]:
+                    new_distance = d + cost
+                    if new_distance < distance.get(other, INFINITY):
+                        distance[other] = new_distance
+                        via[other] = node
+                        while len(buckets) <= new_distance:
+                            buckets.append([])
+                        buckets[new_distance].append(other)
+            buckets[d] = None  # no longer needed
+            d += 1
+
+    def path_length(self, x: int, y: int) -> float:
+        """The number of steps from (x, y) to the target, or infinity if it can't get there."""
+        return self._best(x, y)[0]
+
+    def _best(self, x: int, y: int) -> tuple[float, int]:
+        """The length of the shortest path from (x, y), and the entrance it leaves through (or TO_TARGET)."""
+        pathfinder = self.pathfinder
+        cluster = pathfinder.cluster_of(x, y)
+        local = (x - cluster.x) * cluster.height + (y - cluster.y)
+        best = INFINITY
+        best_via = TO_TARGET
+        if cluster is self.cluster and self.target_distances[local] != UNREACHABLE:
+            best = self.target_distances[local]
+        distance = self.distance
+        entrance_distances = pathfinder.entrance_distances
+        for entrance in cluster.entrances:
+            if entrance not in distance:
+                continue
+            inside = entrance_distances[entrance][local]
+            if inside != UNREACHABLE and inside + distance[entrance] < best:
+                best = inside + distance[entrance]
+                best_via = entrance
+        return best, best_via
+
+    def direction(self, x: int, y: int) -> int:
+        if x == self.target_x and y == self.target_y:
+            return AT_TARGET
+        best, via = self._best(x, y)
+        if best == INFINITY:
+            return NO_PATH
+        pathfinder = self.pathfinder
+        cluster = pathfinder.cluster_of(x, y)
+        local = (x - cluster.x) * cluster.height + (y - cluster.y)
+        cell = x * pathfinder.board.size + y
+        if via == cell:
+            # Standing on the entrance: go where its own shortest path goes
+            via = self.via[cell]
+            if via != TO_TARGET and pathfinder.cluster_of(*divmod(via, pathfinder.board.size)) is not cluster:
+                return _direction_between(cell, via, pathfinder.board.size)
+        if via == TO_TARGET:
+            return downhill(cluster, self.target_distances, local)
+        return downhill(cluster, pathfinder.entrance_distances[via], local)
+
+    def next_cell(self, x: int, y: int) -> tuple[int, int]:
+        """The cell to move to from (x, y). Returns (x, y) itself if it is the target or can't reach it."""
+        d = self.direction(x, y)
+        if d == AT_TARGET or d == NO_PATH:
+            return x, y
+        return x + util.D_X[d], y + util.D_Y[d]
+
+
+def _direction_between(cell: int, neighbor: int, size: int) -> int:
+    return {-size: D.LEFT, size: D.RIGHT, -1: D.UP, 1: D.DOWN}[neighbor - cell]
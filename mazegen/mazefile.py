@@ -0,0 +1,289 @@
+"""Compact binary files for boards, and packs holding many of them.
+
+A maze record is a fixed header followed by two bit-packed planes::
+
+    header       struct HEADER: magic b'DKMZ', version, flags, size, exit x, exit y, seed
+    connections  4 bits per cell, two cells per byte, the even cell in the low nibble
+    powers       3 bits per cell, packed LSB first; 7 stands for an unset power (-1)
+
+Cells are in the same ``x * size + y`` order as :class:`Board`. A 1000x1000 board takes ~0.9 MB.
+
+A pack is a header (magic b'DKMP', version, count) and an index of (offset, length) pairs, followed by the records.
+
+:func:`open_mapped` and :meth:`MazePack.mapped` don't unpack anything up front: they return a
+:class:`MappedBoard` that reads cells straight out of an ``mmap``, so only the pages that are actually touched
+get loaded.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from array import array
+from typing import Iterable, Optional, Union
+
+from mazegen.game_structures import Board
+
+PathLike = Union[str, os.PathLike]
+
+MAZE_MAGIC = b'DKMZ'
+PACK_MAGIC = b'DKMP'
+VERSION = 1
+FLAG_HAS_SEED = 1
+HEADER = struct.Struct('<4sHHIIIQ')  # magic, version, flags, size, exit x, exit y, seed
+PACK_HEADER = struct.Struct('<4sHHQ')  # magic, version, reserved, count
+PACK_INDEX_ENTRY = struct.Struct('<QQ')  # offset, length
+UNSET_POWER = 7
+
+
+class MazeFileError(ValueError):
+    pass
+
+
+def _plane_sizes(size: int) -> tuple[int, int]:
+    cells = size * size
+    return (cells + 1) // 2, (cells * 3 + 7) // 8
+
+
+def record_length(size: int) -> int:
+    connections, powers = _plane_sizes(size)
+    return HEADER.size + connections + powers
+
+
+# Packing
+
+def _pack_connections(masks) -> bytes:
+    # A copy, so read-only planes like a MappedBoard's (which can't be sliced) pack too
+    masks = bytearray(masks)
+    low = masks[0::2]
+    high = masks[1::2]
+    if len(high) < len(low):
+        high.append(0)
+    return bytes(a | b << 4 for a, b in zip(low, high))
+
+
+def _pack_powers(powers: array) -> bytes:
+    values = [UNSET_POWER if p < 0 else p for p in powers]
+    values.extend([0] * (-len(values) % 8))
+    out = bytearray()
+    for i in range(0, len(values), 8):
+        # 8 cells of 3 bits are exactly 3 bytes
+        group = 0
+        for j in range(8):
+            group |= values[i + j] << (3 * j)
+        out += group.to_bytes(3, 'little')
+    return bytes(out[:(len(powers) * 3 + 7) // 8])
+
+
+def dumps(board: Board) -> bytes:
+    if board.seed is not None and not 0 <= board.seed < 1 << 64:
+        raise MazeFileError(f'seed {board.seed} does not fit in the header (0 to 2**64 - 1)')
+    flags = FLAG_HAS_SEED if board.seed is not None else 0
+    header = HEADER.pack(MAZE_MAGIC, VERSION, flags, board.size, board.maze_exit_x, board.maze_exit_y,
+                         board.seed or 0)
+    return header + _pack_connections(board.masks) + _pack_powers(board.powers)
+
+
+def save(board: Board, path: PathLike) -> None:
+    with open(path, 'wb') as f:
+        f.write(dumps(board))
+
+
+# Unpacking
+
+def _read_header(buffer, offset: int) -> tuple[int, int, int, int, Optional[int]]:
+    if len(buffer) - offset < HEADER.size:
+        raise MazeFileError('truncated maze header')
+    magic, version, flags, size, exit_x, exit_y, seed = HEADER.unpack_from(buffer, offset)
+    if magic != MAZE_MAGIC:
+        raise MazeFileError(f'not a maze record (magic {magic!r})')
+    if version != VERSION:
+        raise MazeFileError(f'unsupported maze format version {version}')
+    if len(buffer) - offset < record_length(size):
+        raise MazeFileError('truncated maze record')
+    return size, exit_x, exit_y, flags, seed if flags & FLAG_HAS_SEED else None
+
+
+def loads(buffer, offset: int = 0) -> Board:
+    """Unpack a whole record into an ordinary :class:`Board`."""
+    size, exit_x, exit_y, flags, seed = _read_header(buffer, offset)
+    cells = size * size
+    connections_length, powers_length = _plane_sizes(size)
+    start = offset + HEADER.size
+    packed = bytes(buffer[start:start + connections_length])
+    masks = bytearray(2 * connections_length)
+    masks[0::2] = bytes(b & 0xf for b in packed)
+    masks[1::2] = bytes(b >> 4 for b in packed)
+    del masks[cells:]
+
+    start += connections_length
+    packed = bytes(buffer[start:start + powers_length]) + bytes(3)
+    powers = array('b')
+    for i in range(0, cells, 8):
+        group = int.from_bytes(packed[i // 8 * 3:i // 8 * 3 + 3], 'little')
+        powers.extend((group >> (3 * j)) & 7 for j in range(min(8, cells - i)))
+    for i, power in enumerate(powers):
+        if power == UNSET_POWER:
+            powers[i] = -1
+
+    board = Board()
+    board.size = size
+    board.masks = masks
+    board.powers = powers
+    board.maze_exit_x = exit_x
+    board.maze_exit_y = exit_y
+    board.seed = seed
+    return board
+
+
+def load(path: PathLike) -> Board:
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+# Memory-mapped boards
+
+class _ConnectionPlane:
+    """Read-only sequence of connection masks, decoded from a nibble-packed buffer on access."""
+    __slots__ = ('buffer', 'offset', 'cells')
+
+    def __init__(self, buffer, offset: int, cells: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.cells = cells
+
+    def __len__(self) -> int:
+        return self.cells
+
+    def __getitem__(self, i: int) -> int:
+        if not 0 <= i < self.cells:
+            raise IndexError(i)
+        return self.buffer[self.offset + (i >> 1)] >> ((i & 1) << 2) & 0xf
+
+
+class _PowerPlane:
+    """Read-only sequence of powers, decoded from a 3-bit packed buffer on access."""
+    __slots__ = ('buffer', 'offset', 'cells')
+
+    def __init__(self, buffer, offset: int, cells: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.cells = cells
+
+    def __len__(self) -> int:
+        return self.cells
+
+    def __getitem__(self, i: int) -> int:
+        if not 0 <= i < self.cells:
+            raise IndexError(i)
+        bit = i * 3
+        byte = self.offset + (bit >> 3)
+        # A value can straddle two bytes; the last one never does, so don't read past the plane
+        value = self.buffer[byte] | (self.buffer[byte + 1] << 8 if (bit & 7) > 5 else 0)
+        power = value >> (bit & 7) & 7
+        return -1 if power == UNSET_POWER else power
+
+
+class MappedBoard(Board):
+    """A read-only :class:`Board` whose cells are decoded from a packed record on every access.
+
+    It works anywhere a Board is only read (``board.board[x][y]``, ``masks[i]``, ``powers[i]``), but each access
+    costs a little more. Use :func:`loads` instead when a board will be read over and over.
+    """
+
+    def __init__(self, buffer, offset: int = 0):
+        super().__init__()
+        self.buffer = buffer
+        size, exit_x, exit_y, flags, seed = _read_header(buffer, offset)
+        connections_length, _ = _plane_sizes(size)
+        self.size = size
+        self.masks = _ConnectionPlane(buffer, offset + HEADER.size, size * size)
+        self.powers = _PowerPlane(buffer, offset + HEADER.size + connections_length, size * size)
+        self.maze_exit_x = exit_x
+        self.maze_exit_y = exit_y
+        self.seed = seed
+
+    def reset(self, size: int) -> None:
+        raise TypeError('a mapped board is read-only')
+
+    def set_power(self, x: int, y: int, power: int) -> None:
+        raise TypeError('a mapped board is read-only')
+
+    def to_board(self) -> Board:
+        """Unpack into an ordinary, writable Board."""
+        return loads(self.buffer, self.masks.offset - HEADER.size)
+
+
+def _map(path: PathLike) -> mmap.mmap:
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def open_mapped(path: PathLike) -> MappedBoard:
+    return MappedBoard(_map(path))
+
+
+# Packs
+
+def write_pack(path: PathLike, boards: Iterable[Board]) -> int:
+    """Write the boards into a pack, streaming them so they never all have to be in memory. Returns the count."""
+    index: list[tuple[int, int]] = []
+    records_path = os.fspath(path) + '.tmp'
+    with open(records_path, 'wb') as records:
+        offset = 0
+        for board in boards:
+            record = dumps(board)
+            records.write(record)
+            index.append((offset, len(record)))
+            offset += len(record)
+    data_start = PACK_HEADER.size + PACK_INDEX_ENTRY.size * len(index)
+    try:
+        with open(path, 'wb') as f, open(records_path, 'rb') as records:
+            f.write(PACK_HEADER.pack(PACK_MAGIC, VERSION, 0, len(index)))
+            for offset, length in index:
+                f.write(PACK_INDEX_ENTRY.pack(data_start + offset, length))
+            while chunk := records.read(1 << 20):
+                f.write(chunk)
+    finally:
+        os.remove(records_path)
+    return len(index)
+
+
+class MazePack:
+    """A pack opened with ``mmap``. Boards are only read when asked for."""
+
+    def __init__(self, path: PathLike):
+        self.buffer = _map(path)
+        if len(self.buffer) < PACK_HEADER.size:
+            raise MazeFileError('truncated pack header')
+        magic, version, _, count = PACK_HEADER.unpack_from(self.buffer, 0)
+        if magic != PACK_MAGIC:
+            raise MazeFileError(f'not a maze pack (magic {magic!r})')
+        if version != VERSION:
+            raise MazeFileError(f'unsupported pack format version {version}')
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _offset(self, i: int) -> int:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        offset, _ = PACK_INDEX_ENTRY.unpack_from(self.buffer, PACK_HEADER.size + PACK_INDEX_ENTRY.size * i)
+        return offset
+
+    def __getitem__(self, i: int) -> Board:
+        return loads(self.buffer, self._offset(i))
+
+    def mapped(self, i: int) -> MappedBoard:
+        return MappedBoard(self.buffer, self._offset(i))
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    def __enter__(self) -> MazePack:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
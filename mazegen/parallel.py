@@ -0,0 +1,132 @@
+"""Generates one big board on all cores, tile by tile.
+
+The board is cut into square tiles of ``tile_size`` cells (the last row and column may be narrower). Every tile is
+carved into its own maze by :func:`generator.carve` in a worker process, from a seed drawn from ``rng``. The tile
+holding the exit is rooted at the exit, so like in :func:`generator.fill` no loop ever closes through it.
+
+The tiles are then stitched together in the parent process. A random spanning tree over the tiles, picked with
+Kruskal's algorithm, opens one passage in each border it uses, so the whole board is connected. Every other cell
+pair along every border is opened with the same chance carve gives a loop edge, 1 - LOOP_SKIP_CHANCE. Nothing is
+opened next to the exit, and then the power is spread as usual. The only exception is a border that is one cell
+long and ends at the exit. It is left for last and only opened if the tree can't do without it, and then it is the
+one passage between its tiles, so it can't close a loop through the exit.
+
+The result only depends on ``rng`` and ``tile_size``, not on the number of processes.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import random
+from typing import Optional
+
+from mazegen import generator
+from mazegen.game_structures import Board, D, OPPOSITE
+
+DEFAULT_TILE_SIZE = 256
+
+
+def _carve_tile(job: tuple[int, int, int, int]) -> bytearray:
+    width, height, root, seed = job
+    return generator.carve(width, root, random.Random(seed), height=height)
+
+
+def _find(parents: list[int], tile: int) -> int:
+    while parents[tile] != tile:
+        parents[tile] = parents[parents[tile]]
+        tile = parents[tile]
+    return tile
+
+
+def fill_parallel(board: Board, size: int, rng: random.Random = random, tile_size: int = DEFAULT_TILE_SIZE,
+                  processes: Optional[int] = None) -> None:
+    """Fill the board like :func:`generator.fill`, carving the tiles in ``processes`` processes (default: all cores).
+
+    With a single tile, or ``processes=1``, everything runs in this process.
+    """
+    board.reset(size)
+    board.maze_exit_x = rng.randrange(size)
+    board.maze_exit_y = rng.randrange(size)
+    tiles = -(-size // tile_size)
+    # Tile (tx, ty) is number tx * tiles + ty and covers the cells from (tx * tile_size, ty * tile_size)
+    jobs = []
+    for tx in range(tiles):
+        width = min(tile_size, size - tx * tile_size)
+        for ty in range(tiles):
+            height = min(tile_size, size - ty * tile_size)
+            exit_x = board.maze_exit_x - tx * tile_size
+            exit_y = board.maze_exit_y - ty * tile_size
+            if 0 <= exit_x < width and 0 <= exit_y < height:
+                root = exit_x * height + exit_y
+            else:
+                root = rng.randrange(width * height)
+            jobs.append((width, height, root, rng.getrandbits(63)))
+    if processes == 1 or len(jobs) == 1:
+        tile_masks = list(map(_carve_tile, jobs))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            tile_masks = pool.map(_carve_tile, jobs, chunksize=1)
+
+    masks = board.masks
+    for tile, (width, height, _, _) in enumerate(jobs):
+        first_x = tile // tiles * tile_size
+        first_y = tile % tiles * tile_size
+        for lx in range(width):
+            start = (first_x + lx) * size + first_y
+            masks[start:start + height] = tile_masks[tile][lx * height:(lx + 1) * height]
+    stitch(board, tile_size, rng)
+    generator.spread_power(board, rng)
+
+
+def stitch(board: Board, tile_size: int, rng: random.Random = random) -> None:
+    """Opens passages between tiles that are each connected inside, so the whole board is connected."""
+    size = board.size
+    masks = board.masks
+    tiles = -(-size // tile_size)
+    exit_cell = board.maze_exit_x * size + board.maze_exit_y
+    # Every border between two tiles, as (tile, neighbouring tile, direction from the first to the second)
+    borders = []
+    for tx in range(tiles):
+        for ty in range(tiles):
+            if tx < tiles - 1:
+                borders.append((tx * tiles + ty, (tx + 1) * tiles + ty, D.RIGHT))
+            if ty < tiles - 1:
+                borders.append((tx * tiles + ty, tx * tiles + ty + 1, D.DOWN))
+    rng.shuffle(borders)
+    parents = list(range(tiles * tiles))
+    # Borders whose only cell pair touches the exit, as (tile, neighbouring tile, cell, direction, step)
+    exit_borders = []
+    for tile, neighbor, d in borders:
+        tx, ty = divmod(tile, tiles)
+        # The cells of the first tile along the border, and the step across it
+        if d == D.RIGHT:
+            x = (tx + 1) * tile_size - 1
+            cells = [x * size + y for y in range(ty * tile_size, min(size, (ty + 1) * tile_size))]
+            step = size
+        else:
+            y = (ty + 1) * tile_size - 1
+            cells = [x * size + y for x in range(tx * tile_size, min(size, (tx + 1) * tile_size))]
+            step = 1
+        away_from_exit = [cell for cell in cells if cell != exit_cell and cell + step != exit_cell]
+        if not away_from_exit:
+            exit_borders.append((tile, neighbor, cells[0], d, step))
+            continue
+        cells = away_from_exit
+        root, other_root = _find(parents, tile), _find(parents, neighbor)
+        if root != other_root:
+            # Part of the spanning tree over the tiles
+            parents[root] = other_root
+            tree_cell = rng.choice(cells)
+        else:
+            tree_cell = None
+        for cell in cells:
+            if cell == tree_cell or rng.random() > generator.LOOP_SKIP_CHANCE:
+                masks[cell] |= 1 << d
+                masks[cell + step] |= 1 << OPPOSITE[d]
+    for tile, neighbor, cell, d, step in exit_borders:
+        root, other_root = _find(parents, tile), _find(parents, neighbor)
+        if root != other_root:
+            # The tiles are still apart, so this is the first and only passage between them
+            parents[root] = other_root
+            masks[cell] |= 1 << d
+            masks[cell + step] |= 1 << OPPOSITE[d]
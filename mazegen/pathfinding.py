@@ -0,0 +1,160 @@
+"""Shared pathfinding towards a target cell (normally the player)."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Optional
+
+import util
+from mazegen.game_structures import OPPOSITE, Board, D
+
+# Special values of FlowField.directions
+AT_TARGET = 4
+NO_PATH = 255
+
+
+class FlowField:
+    """For every cell of a board, the direction of the first step along a shortest path to the target cell.
+
+    With a ``radius`` (by default the board's ``flow_radius``), only the square of cells within that many cells of
+    the target is searched, and paths can't leave it. ``directions`` then covers just that window: cell (x, y) is at
+    ``(x - origin_x) * height + (y - origin_y)``. Cells outside it have NO_PATH.
+    """
+    __slots__ = ('size', 'target_x', 'target_y', 'origin_x', 'origin_y', 'width', 'height', 'directions')
+
+    def __init__(self, board: Board, target_x: int, target_y: int, radius: Optional[int] = None):
+        self.size = board.size
+        self.target_x = target_x
+        self.target_y = target_y
+        if radius is None:
+            radius = board.flow_radius
+        if radius is None:
+            self.origin_x = self.origin_y = 0
+            self.width = self.height = board.size
+        else:
+            self.origin_x = max(0, target_x - radius)
+            self.origin_y = max(0, target_y - radius)
+            self.width = min(board.size, target_x + radius + 1) - self.origin_x
+            self.height = min(board.size, target_y + radius + 1) - self.origin_y
+        self.directions = bytearray([NO_PATH]) * (self.width * self.height)
+        if radius is None:
+            self._fill(board.masks)
+        else:
+            self._fill_window(board.masks)
+
+    def _fill(self, masks: bytearray) -> None:
+        # BFS outwards from the target. Whenever we step into a new cell, the way back is the step it should take.
+        size = self.size
+        directions = self.directions
+        target = self.target_x * size + self.target_y
+        directions[target] = AT_TARGET
+        offsets = [-size, size, -1, 1]  # cell index delta for each direction, in D order
+        queue = [target]
+        for cell in queue:  # the list grows while we iterate over it
+            mask = masks[cell]
+            for d in (D.LEFT, D.RIGHT, D.UP, D.DOWN):
+                if not mask >> d & 1:
+                    continue
+                neighbor = cell + offsets[d]
+                if directions[neighbor] != NO_PATH:
+                    continue
+                directions[neighbor] = OPPOSITE[d]
+                queue.append(neighbor)
+
+    def _fill_window(self, masks) -> None:
+        # Same BFS, in window coordinates; the edge of the window has to be checked, unlike the edge of the board
+        size = self.size
+        width = self.width
+        height = self.height
+        origin_x = self.origin_x
+        origin_y = self.origin_y
+        directions = self.directions
+        target_x = self.target_x - origin_x
+        target_y = self.target_y - origin_y
+        directions[target_x * height + target_y] = AT_TARGET
+        queue = [(target_x, target_y)]
+        for x, y in queue:
+            mask = masks[(x + origin_x) * size + y + origin_y]
+            for d in (D.LEFT, D.RIGHT, D.UP, D.DOWN):
+                if not mask >> d & 1:
+                    continue
+                nx = x + util.D_X[d]
+                ny = y + util.D_Y[d]
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                neighbor = nx * height + ny
+                if directions[neighbor] != NO_PATH:
+                    continue
+                directions[neighbor] = OPPOSITE[d]
+                queue.append((nx, ny))
+
+    def direction(self, x: int, y: int) -> int:
+        local_x = x - self.origin_x
+        local_y = y - self.origin_y
+        if not (0 <= local_x < self.width and 0 <= local_y < self.height):
+            return NO_PATH
+        return self.directions[local_x * self.height + local_y]
+
+    def next_cell(self, x: int, y: int) -> tuple[int, int]:
+        """The cell to move to from (x, y). Returns (x, y) itself if it is the target or can't reach it."""
+        d = self.direction(x, y)
+        if d == AT_TARGET or d == NO_PATH:
+            return x, y
+        return x + util.D_X[d], y + util.D_Y[d]
+
+
+def first_step(board: Board, x: int, y: int, target_x: int, target_y: int, limit: int) -> int:
+    """The direction of the first step along a shortest path from (x, y) to the target, without a flow field.
+
+    A BFS from (x, y) that gives up after visiting ``limit`` cells and returns NO_PATH, so it's cheap for targets
+    close by, like a cell a monster just saw the player in. Returns AT_TARGET at the target.
+    """
+    if (x, y) == (target_x, target_y):
+        return AT_TARGET
+    size = board.size
+    masks = board.masks
+    target = target_x * size + target_y
+    offsets = [-size, size, -1, 1]  # cell index delta for each direction, in D order
+    # The first step that led to each visited cell
+    first: dict[int, int] = {x * size + y: AT_TARGET}
+    queue = [x * size + y]
+    for cell in queue:  # the list grows while we iterate over it
+        mask = masks[cell]
+        for d in (D.LEFT, D.RIGHT, D.UP, D.DOWN):
+            if not mask >> d & 1:
+                continue
+            neighbor = cell + offsets[d]
+            if neighbor in first:
+                continue
+            step = d if first[cell] == AT_TARGET else first[cell]
+            if neighbor == target:
+                return step
+            first[neighbor] = step
+            queue.append(neighbor)
+        if len(first) >= limit:
+            break
+    return NO_PATH
+
+
+class FlowFieldCache:
+    """Least-recently-used cache of flow fields keyed by target cell. Players backtrack a lot, so it pays off."""
+
+    def __init__(self, board: Board, capacity: int = 16):
+        self.board = board
+        self.capacity = capacity
+        self.fields: OrderedDict[tuple[int, int], FlowField] = OrderedDict()
+
+    def get(self, target_x: int, target_y: int) -> FlowField:
+        key = (target_x, target_y)
+        field = self.fields.get(key)
+        if field is not None:
+            self.fields.move_to_end(key)
+            return field
+        field = FlowField(self.board, target_x, target_y)
+        self.fields[key] = field
+        if len(self.fields) > self.capacity:
+            self.fields.popitem(last=False)
+        return field
+
+    def clear(self) -> None:
+        self.fields.clear()
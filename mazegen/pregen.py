@@ -0,0 +1,75 @@
+"""Generates boards ahead of time in a background process, so starting a game doesn't have to wait for fill()."""
+
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import random
+from typing import Optional
+
+from mazegen import generator
+from mazegen.game_structures import Board
+
+DEFAULT_DEPTH = 2
+
+
+def _worker(size: int, boards: multiprocessing.Queue) -> None:
+    rng = random.Random()
+    while True:
+        board = Board()
+        generator.fill_seeded(board, size, rng.getrandbits(63))
+        boards.put(board)  # blocks while the queue is full
+
+
+class MazePool:
+    """A bounded queue of ready boards of one size, kept topped up by a worker process.
+
+    Call :meth:`pop` to take a board; if none is ready yet it falls back to generating one on the spot.
+    Changing the size with :meth:`set_size` throws away the queued boards and restarts the worker.
+    """
+
+    def __init__(self, size: int, depth: int = DEFAULT_DEPTH):
+        self.size = size
+        self.depth = depth
+        self.boards: Optional[multiprocessing.Queue] = None
+        self.process: Optional[multiprocessing.Process] = None
+
+    def start(self) -> None:
+        if self.process is not None:
+            return
+        self.boards = multiprocessing.Queue(maxsize=self.depth)
+        self.process = multiprocessing.Process(target=_worker, args=(self.size, self.boards), daemon=True,
+                                               name=f'maze-pregen-{self.size}')
+        self.process.start()
+
+    def close(self) -> None:
+        if self.process is None:
+            return
+        self.process.terminate()
+        self.process.join()
+        self.boards.close()
+        self.process = None
+        self.boards = None
+
+    def set_size(self, size: int) -> None:
+        if size == self.size:
+            return
+        running = self.process is not None
+        self.close()
+        self.size = size
+        if running:
+            self.start()
+
+    def pop(self, rng: random.Random = random) -> Board:
+        """A ready board if there is one, otherwise a freshly generated one (using ``rng``)."""
+        if self.boards is not None:
+            try:
+                board = self.boards.get_nowait()
+            except queue.Empty:
+                pass
+            else:
+                if board.size == self.size:
+                    return board
+        board = Board()
+        generator.fill_seeded(board, self.size, rng.getrandbits(63))
+        return board
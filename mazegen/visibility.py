@@ -0,0 +1,91 @@
+"""What can be seen from each cell: the cells straight down the open corridors in the four directions.
+
+From a cell you see along a row or column until the first wall. That's fully described by four numbers per cell,
+how many cells the view reaches in each direction, so a :class:`VisibilityTable` keeps those in one flat array
+instead of a set of cells per cell. They are computed in one pass per row and column. Whether one cell sees
+another is then a comparison, and the cells seen from one cell can be listed without touching any other.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Iterator
+
+from mazegen.game_structures import Board, D
+
+
+class VisibilityTable:
+    """``reach[cell * 4 + d]`` is how many cells one can see from ``cell`` in direction ``d``, cells ``x * size + y``.
+
+    The board's walls may change afterwards; call :meth:`update` with the cells on either side of the wall.
+    """
+
+    def __init__(self, board: Board):
+        self.board = board
+        self.size = board.size
+        self.reach = array('H', bytes(2 * 4 * board.size * board.size))
+        for i in range(self.size):
+            self._update_column(i)
+            self._update_row(i)
+
+    def _update_column(self, x: int) -> None:
+        # Up counts from the top of the column, down from the bottom
+        size = self.size
+        masks = self.board.masks
+        reach = self.reach
+        first = x * size
+        up = 0
+        for cell in range(first, first + size):
+            up = up + 1 if masks[cell] >> D.UP & 1 else 0
+            reach[cell * 4 + D.UP] = up
+        down = 0
+        for cell in range(first + size - 1, first - 1, -1):
+            down = down + 1 if masks[cell] >> D.DOWN & 1 else 0
+            reach[cell * 4 + D.DOWN] = down
+
+    def _update_row(self, y: int) -> None:
+        size = self.size
+        masks = self.board.masks
+        reach = self.reach
+        left = 0
+        for cell in range(y, size * size, size):
+            left = left + 1 if masks[cell] >> D.LEFT & 1 else 0
+            reach[cell * 4 + D.LEFT] = left
+        right = 0
+        for cell in range(size * (size - 1) + y, -1, -size):
+            right = right + 1 if masks[cell] >> D.RIGHT & 1 else 0
+            reach[cell * 4 + D.RIGHT] = right
+
+    def update(self, x: int, y: int) -> None:
+        """Recomputes the row and column through (x, y), after one of its connections changed. O(size)."""
+        self._update_column(x)
+        self._update_row(y)
+
+    def reach_of(self, x: int, y: int, d: int) -> int:
+        return self.reach[(x * self.size + y) * 4 + d]
+
+    def visible(self, x: int, y: int, target_x: int, target_y: int) -> bool:
+        """Whether (target_x, target_y) can be seen from (x, y). Seeing is mutual, so the order doesn't matter."""
+        base = (x * self.size + y) * 4
+        if x == target_x:
+            if target_y >= y:
+                return target_y - y <= self.reach[base + D.DOWN]
+            return y - target_y <= self.reach[base + D.UP]
+        if y == target_y:
+            if target_x > x:
+                return target_x - x <= self.reach[base + D.RIGHT]
+            return x - target_x <= self.reach[base + D.LEFT]
+        return False
+
+    def visible_cells(self, x: int, y: int) -> Iterator[tuple[int, int]]:
+        """The cells seen from (x, y), starting with itself."""
+        base = (x * self.size + y) * 4
+        yield x, y
+        for i in range(1, self.reach[base + D.LEFT] + 1):
+            yield x - i, y
+        for i in range(1, self.reach[base + D.RIGHT] + 1):
+            yield x + i, y
+        for i in range(1, self.reach[base + D.UP] + 1):
+            yield x, y - i
+        for i in range(1, self.reach[base + D.DOWN] + 1):
+            yield x, y + i
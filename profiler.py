@@ -0,0 +1,128 @@
+"""Per-phase frame timings, kept in ring buffers.
+
+Code marks the end of each phase with ``profiler.mark(PHASE)``, which charges the time since the previous mark to
+that phase, and the main loop calls ``end_frame()`` once per frame. While the profiler is off, ``mark`` and
+``end_frame`` are no-op functions, so leaving the calls in costs one function call each.
+
+Set ``DARKNESS_PROFILE=path.csv`` (or ``.json``) to record from the start and write the data there on exit.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from array import array
+from typing import Optional
+
+EVENTS = 0
+INPUT = 1
+PHYSICS = 2
+MONSTERS = 3
+MAZE = 4  # the maze, the player and the monsters drawn onto the canvas
+HUD = 5
+DISPLAY = 6
+WAIT = 7  # sleeping in clock.tick until the next frame is due; not work
+PHASE_NAMES = ('events', 'input', 'physics', 'monsters', 'maze', 'hud', 'display', 'wait')
+WORK_PHASES = range(WAIT)
+
+DEFAULT_CAPACITY = 600  # frames; 4 to 10 seconds, depending on the frame rate
+EXPORT_ENV = 'DARKNESS_PROFILE'
+
+
+def _noop(*args) -> None:
+    pass
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))]
+
+
+class Profiler:
+    """Frame timings per phase over the last ``capacity`` frames, in seconds."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.phases = [array('d', bytes(8 * capacity)) for _ in PHASE_NAMES]
+        self.current = [0.0] * len(PHASE_NAMES)  # the frame being recorded
+        self.index = 0  # where the next frame goes
+        self.count = 0
+        self.last_mark = 0.0
+        self.enabled = False
+        self.mark = _noop
+        self.end_frame = _noop
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.last_mark = time.perf_counter()
+        self.current = [0.0] * len(PHASE_NAMES)
+        self.mark = self._mark
+        self.end_frame = self._end_frame
+
+    def disable(self) -> None:
+        self.enabled = False
+        self.mark = _noop
+        self.end_frame = _noop
+
+    def toggle(self) -> None:
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def _mark(self, phase: int) -> None:
+        now = time.perf_counter()
+        self.current[phase] += now - self.last_mark
+        self.last_mark = now
+
+    def _end_frame(self) -> None:
+        current = self.current
+        for phase, buffer in enumerate(self.phases):
+            buffer[self.index] = current[phase]
+            current[phase] = 0.0
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def history(self, phase: int) -> list[float]:
+        """The recorded frames of a phase, oldest first."""
+        buffer = self.phases[phase]
+        if self.count < self.capacity:
+            return buffer[:self.count].tolist()
+        return buffer[self.index:].tolist() + buffer[:self.index].tolist()
+
+    def work_history(self) -> list[float]:
+        """Time per frame spent doing anything but waiting for the next frame, oldest first."""
+        return [sum(frame) for frame in zip(*(self.history(phase) for phase in WORK_PHASES))]
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Mean, p50 and p99 per phase and for the work of a whole frame, in milliseconds."""
+        result = {}
+        columns = [(name, self.history(phase)) for phase, name in enumerate(PHASE_NAMES)]
+        columns.append(('work', self.work_history()))
+        for name, values in columns:
+            values.sort()
+            result[name] = {
+                'mean_ms': sum(values) / len(values) * 1000 if values else 0.0,
+                'p50_ms': percentile(values, 0.5) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+            }
+        return result
+
+    def export(self, path: str) -> None:
+        """Writes every recorded frame as CSV, or the frames and a summary as JSON if the path ends in .json."""
+        columns = [self.history(phase) for phase in range(len(PHASE_NAMES))]
+        frames = [[value * 1000 for value in frame] for frame in zip(*columns)]
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump({'phases': list(PHASE_NAMES), 'frames_ms': frames, 'summary': self.summary()}, f)
+            return
+        with open(path, 'w') as f:
+            f.write(','.join(f'{name}_ms' for name in PHASE_NAMES) + '\n')
+            for frame in frames:
+                f.write(','.join(f'{value:.4f}' for value in frame) + '\n')
+
+
+def export_path() -> Optional[str]:
+    return os.environ.get(EXPORT_ENV) or None
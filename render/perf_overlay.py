@@ -0,0 +1,61 @@
+"""The F3 overlay: a frame time graph and per-phase p99s from the profiler."""
+
+from __future__ import annotations
+
+import pygame
+
+from profiler import PHASE_NAMES, WORK_PHASES, Profiler
+
+WIDTH = 300
+GRAPH_HEIGHT = 80
+LINE_HEIGHT = 16
+PADDING = 6
+GRAPH_SCALE_MS = 33.3  # the top of the graph; the line in the middle is 60 FPS
+SUMMARY_EVERY = 30  # frames; sorting 600 values per phase every frame would show up in the numbers
+BACKGROUND_COLOR = (0, 0, 0, 180)
+BAR_COLOR = 0x40c040
+SLOW_BAR_COLOR = 0xe04040
+TEXT_COLOR = 0xffffff
+
+
+class PerfOverlay:
+    def __init__(self, profiler: Profiler, font: pygame.font.Font):
+        self.profiler = profiler
+        self.font = font
+        self.lines: list[pygame.Surface] = []
+        self.frames_since_summary = SUMMARY_EVERY
+
+    @property
+    def height(self) -> int:
+        return GRAPH_HEIGHT + (len(PHASE_NAMES) + 1) * LINE_HEIGHT + 3 * PADDING
+
+    def _refresh_text(self) -> None:
+        summary = self.profiler.summary()
+        rows = [('work', summary['work'])] + [(PHASE_NAMES[phase], summary[PHASE_NAMES[phase]])
+                                              for phase in WORK_PHASES]
+        self.lines = [self.font.render(f'{name:<9} mean {stats["mean_ms"]:6.2f}  p99 {stats["p99_ms"]:6.2f} ms',
+                                       True, TEXT_COLOR)
+                      for name, stats in rows]
+
+    def draw(self, canvas: pygame.Surface, x: int, y: int) -> pygame.Rect:
+        self.frames_since_summary += 1
+        if self.frames_since_summary >= SUMMARY_EVERY:
+            self._refresh_text()
+            self.frames_since_summary = 0
+
+        panel = pygame.Surface((WIDTH, self.height), pygame.SRCALPHA)
+        panel.fill(BACKGROUND_COLOR)
+        # One bar per frame, newest on the right
+        work = self.profiler.work_history()[-(WIDTH - 2 * PADDING):]
+        bottom = PADDING + GRAPH_HEIGHT
+        left = WIDTH - PADDING - len(work)
+        for i, seconds in enumerate(work):
+            ms = seconds * 1000
+            bar = min(GRAPH_HEIGHT, round(ms / GRAPH_SCALE_MS * GRAPH_HEIGHT))
+            color = SLOW_BAR_COLOR if ms > 1000 / 60 else BAR_COLOR
+            pygame.draw.line(panel, color, (left + i, bottom), (left + i, bottom - bar))
+        middle = bottom - GRAPH_HEIGHT // 2
+        pygame.draw.line(panel, TEXT_COLOR, (PADDING, middle), (WIDTH - PADDING, middle))
+        for i, line in enumerate(self.lines):
+            panel.blit(line, (PADDING, bottom + PADDING + i * LINE_HEIGHT))
+        return canvas.blit(panel, (x, y))
@@ -0,0 +1,136 @@
+"""Pre-rendered chunks of the maze, so the static geometry isn't re-drawn rect by rect every frame."""
+
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from typing import Optional
+
+import pygame
+
+import game
+from mazegen.game_structures import Board, D, power_color
+from render.lightmap import LightMap
+
+CHUNK_CELLS = 2  # a chunk is CHUNK_CELLS x CHUNK_CELLS cells; at CELL_SIZE = 440 that's ~3 MB per chunk
+DEFAULT_CAPACITY = 16
+BACKGROUND_COLOR = 0x252525
+EXIT_COLOR = 0xffffff
+# With a light map, the walls are drawn on a layer above the light, with see-through holes of this color for the floor
+FLOOR_HOLE_COLOR = 0xff00ff
+
+
+class TileCache:
+    """Lazily renders the maze into fixed-size chunk surfaces and keeps the most recently used ones.
+
+    Chunk (cx, cy) covers the pixels of cells ``cx*CHUNK_CELLS`` up to (but excluding) ``(cx+1)*CHUNK_CELLS``.
+    The edges on the left/top of a cell stick out ``THICKNESS`` pixels into the previous chunk, so a chunk also
+    draws the first row and column of cells of the next chunks and lets the surface clip them.
+
+    With a light map, the chunk starts out as the light texture and the walls are laid over it with the floor cut
+    out; otherwise every cell gets the flat grey of its power, as before.
+    """
+
+    def __init__(self, board: Board, capacity: int = DEFAULT_CAPACITY, light_map: Optional[LightMap] = None):
+        self.board = board
+        self.capacity = capacity
+        self.light_map = light_map
+        self.chunk_pixels = CHUNK_CELLS * game.CELL_SIZE
+        self.chunks: OrderedDict[tuple[int, int], pygame.Surface] = OrderedDict()
+        board.power_listeners.append(self.invalidate_cell)
+
+    def close(self) -> None:
+        """Stop listening to the board and drop every chunk."""
+        if self.invalidate_cell in self.board.power_listeners:
+            self.board.power_listeners.remove(self.invalidate_cell)
+        if self.light_map is not None:
+            self.light_map.close()
+        self.chunks.clear()
+
+    def invalidate_cell(self, x: int, y: int) -> None:
+        """Drop the chunks showing the cell or its edges. Called by the board when the cell's power changes."""
+        # The cell's color also shows up in the edges drawn by the cells to its right and below it
+        # With a light map, its neighbours' smoothed light and the interpolation out to their centres change too
+        reach = 2 if self.light_map is not None else 0
+        pixel_min_x = (x - reach) * game.CELL_SIZE - game.THICKNESS
+        pixel_max_x = (x + 2 + reach) * game.CELL_SIZE - game.THICKNESS - 1
+        pixel_min_y = (y - reach) * game.CELL_SIZE - game.THICKNESS
+        pixel_max_y = (y + 2 + reach) * game.CELL_SIZE - game.THICKNESS - 1
+        for cx in range(pixel_min_x // self.chunk_pixels, pixel_max_x // self.chunk_pixels + 1):
+            for cy in range(pixel_min_y // self.chunk_pixels, pixel_max_y // self.chunk_pixels + 1):
+                self.chunks.pop((cx, cy), None)
+
+    def chunk(self, cx: int, cy: int) -> pygame.Surface:
+        key = (cx, cy)
+        surface = self.chunks.get(key)
+        if surface is not None:
+            self.chunks.move_to_end(key)
+            return surface
+        surface = self.render_chunk(cx, cy)
+        self.chunks[key] = surface
+        while len(self.chunks) > self.capacity:
+            self.chunks.popitem(last=False)
+        return surface
+
+    def new_surface(self) -> pygame.Surface:
+        surface = pygame.Surface((self.chunk_pixels, self.chunk_pixels))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+    def render_chunk(self, cx: int, cy: int) -> pygame.Surface:
+        surface = self.new_surface()
+        x0 = cx * CHUNK_CELLS
+        y0 = cy * CHUNK_CELLS
+        lit = self.light_map is not None
+        if lit:
+            self.light_map.paint(surface, x0, y0, CHUNK_CELLS)
+            layer = self.new_surface()
+            layer.set_colorkey(FLOOR_HOLE_COLOR)
+        else:
+            layer = surface
+        layer.fill(BACKGROUND_COLOR)
+        board = self.board
+        size = board.size
+        masks = board.masks
+        powers = board.powers
+        cell = game.CELL_SIZE
+        thickness = game.THICKNESS
+        opening = game.OPENING_BUFFER_SIZE
+        for x in range(max(0, x0), min(size, x0 + CHUNK_CELLS + 1)):
+            for y in range(max(0, y0), min(size, y0 + CHUNK_CELLS + 1)):
+                x_c = (x - x0) * cell
+                y_c = (y - y0) * cell
+                i = x * size + y
+                node_power_color = FLOOR_HOLE_COLOR if lit else power_color(powers[i])
+                cell_color = EXIT_COLOR if x == board.maze_exit_x and y == board.maze_exit_y else node_power_color
+                pygame.draw.rect(layer, cell_color,
+                                 pygame.Rect(x_c + thickness, y_c + thickness, cell - 2 * thickness,
+                                             cell - 2 * thickness))
+                # Left sided edge
+                if masks[i] >> D.LEFT & 1:
+                    # edge color is the darker of the two node colors
+                    edge_color = FLOOR_HOLE_COLOR if lit else min(node_power_color, power_color(powers[i - size]))
+                    pygame.draw.rect(layer, edge_color,
+                                     pygame.Rect(x_c - thickness, y_c + opening, 2 * thickness, cell - 2 * opening))
+                # Top sided edge
+                if masks[i] >> D.UP & 1:
+                    edge_color = FLOOR_HOLE_COLOR if lit else min(node_power_color, power_color(powers[i - 1]))
+                    pygame.draw.rect(layer, edge_color,
+                                     pygame.Rect(x_c + opening, y_c - thickness, cell - 2 * opening, 2 * thickness))
+        if lit:
+            surface.blit(layer, (0, 0))
+        return surface
+
+    def draw(self, canvas: pygame.Surface, x_range: range, y_range: range, alignment_x: float,
+             alignment_y: float) -> None:
+        """Blit the chunks covering the given (visible) cells."""
+        cx_range = range(x_range.start // CHUNK_CELLS, (x_range.stop - 1) // CHUNK_CELLS + 1)
+        cy_range = range(y_range.start // CHUNK_CELLS, (y_range.stop - 1) // CHUNK_CELLS + 1)
+        # Never evict a chunk we need for this very frame
+        self.capacity = max(self.capacity, len(cx_range) * len(cy_range))
+        for cx in cx_range:
+            for cy in cy_range:
+                # floor, not int(): chunks often start left of/above the window, and they must not shift by a pixel
+                canvas.blit(self.chunk(cx, cy), (math.floor(cx * self.chunk_pixels + alignment_x),
+                                                 math.floor(cy * self.chunk_pixels + alignment_y)))
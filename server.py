@@ -0,0 +1,432 @@
+"""Hosts many headless games in one asyncio event loop, for bots and thin clients on a local socket.
+
+Run from the repository root, for example::
+
+    python server.py --tcp 127.0.0.1:7777
+    python server.py --unix /tmp/darkness.sock
+    python server.py --report --sessions 200 --seconds 10
+
+Every session is a :class:`Game` without a canvas, with its own :class:`Main` for the tick counter. Sessions are
+ticked at their own rate from one scheduler, which catches up at most MAX_CATCH_UP_STEPS at a time like Main.run.
+The CPU time of every tick is added to the session, so ``--report`` can tell how many sessions one core keeps at
+60 TPS.
+
+Protocol: one session per connection, little-endian binary messages, each starting with a one-byte type.
+
+Client to server:
+
+- START ``<BHQ``: type, board size (2 to MAX_BOARD_SIZE), seed. Starts a new game, ending the current one. The
+  maze is generated off the event loop; messages sent meanwhile are handled once STARTED has been sent.
+- INPUT ``<BB``: type, keys held (bits KEY_UP, KEY_LEFT, KEY_DOWN, KEY_RIGHT), applied until the next INPUT.
+- STOP ``<B``: ends the current game.
+
+Server to client:
+
+- STARTED ``<BIHHHH``: type, session id, board size, exit x, exit y, monster count.
+- DELTA ``<BIBH``: type, tick, flags, monster entry count. If flags has DELTA_PLAYER, the player follows as ``<ii``.
+  Then every monster entry is ``<Hii``: index, x, y. Positions are whole pixels. A delta only holds what changed
+  since the last delta the client was sent, so the first one after STARTED holds everything.
+- ENDED ``<BBI``: type, outcome (OUTCOME_LOSE, OUTCOME_WIN, OUTCOME_STOPPED or OUTCOME_ERROR), ticks played.
+- ERROR ``<BB``: type, why (ERROR_BAD_SIZE or ERROR_UNKNOWN_MESSAGE). The server closes the connection after it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import struct
+import time
+from typing import Optional
+
+import numpy as np
+
+from game import Game, PlayerInput, Playing
+from headless import Autopilot, Controller, new_game
+from main import Main
+
+START = struct.Struct('<BHQ')
+INPUT = struct.Struct('<BB')
+STOP = struct.Struct('<B')
+MSG_START = 1
+MSG_INPUT = 2
+MSG_STOP = 3
+
+STARTED = struct.Struct('<BIHHHH')
+DELTA = struct.Struct('<BIBH')
+PLAYER = struct.Struct('<ii')
+ENDED = struct.Struct('<BBI')
+ERROR = struct.Struct('<BB')
+MSG_STARTED = 1
+MSG_DELTA = 2
+MSG_ENDED = 3
+MSG_ERROR = 4
+MONSTER_ENTRY = np.dtype([('index', '<u2'), ('x', '<i4'), ('y', '<i4')])
+
+KEY_UP = 1
+KEY_LEFT = 2
+KEY_DOWN = 4
+KEY_RIGHT = 8
+DELTA_PLAYER = 1
+OUTCOME_LOSE = 0
+OUTCOME_WIN = 1
+OUTCOME_STOPPED = 2
+OUTCOME_ERROR = 3
+ERROR_BAD_SIZE = 1
+ERROR_UNKNOWN_MESSAGE = 2
+
+MAX_BOARD_SIZE = 200
+# While more than this is waiting to be sent to a client, its deltas are skipped; the next one catches it up
+MAX_WRITE_BUFFER = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def keys_to_input(keys: int) -> PlayerInput:
+    return PlayerInput(up=bool(keys & KEY_UP), left=bool(keys & KEY_LEFT), down=bool(keys & KEY_DOWN),
+                       right=bool(keys & KEY_RIGHT))
+
+
+class Session:
+    """One game, its input and where its state goes: a socket (``writer``), or nowhere for local bots."""
+
+    def __init__(self, session_id: int, tps: int = Main.TPS, writer: Optional[asyncio.StreamWriter] = None,
+                 controller: Optional[Controller] = None):
+        self.id = session_id
+        self.tps = tps
+        self.writer = writer
+        # Bots decide their own input every tick; socket clients send it
+        self.controller = controller
+        self.player_input = PlayerInput()
+        self.game: Optional[Game] = None
+        self.board_size = 0
+        self.seed = 0
+        self.next_tick = 0.0  # event loop time
+        self.ticks = 0  # over all games, like cpu_seconds
+        self.cpu_seconds = 0.0
+        self.late_ticks = 0  # ticks dropped because the session fell too far behind
+        self.closed = False
+        # The state the client was last sent: the player and monster positions in whole pixels
+        self.sent_player: Optional[tuple[int, int]] = None
+        self.sent_x = np.zeros(0, dtype=np.int32)
+        self.sent_y = np.zeros(0, dtype=np.int32)
+
+    @property
+    def playing(self) -> bool:
+        return self.game is not None and self.game.playing == Playing.GAME
+
+    async def start(self, board_size: int, seed: int) -> None:
+        """Generates the game in a worker thread, so the other sessions keep ticking meanwhile, then installs it."""
+        self.board_size = board_size
+        self.seed = seed
+        game, setup_seconds = await asyncio.get_running_loop().run_in_executor(None, _setup_game, board_size, seed)
+        start = time.thread_time()
+        self.cpu_seconds += setup_seconds
+        self.game = game
+        self.player_input = PlayerInput()
+        self.sent_player = None
+        self.sent_x = np.full(len(self.game.monsters), np.iinfo(np.int32).min, dtype=np.int32)
+        self.sent_y = self.sent_x.copy()
+        board = self.game.board
+        self.send(STARTED.pack(MSG_STARTED, self.id, board.size, board.maze_exit_x, board.maze_exit_y,
+                               len(self.game.monsters)))
+        self.cpu_seconds += time.thread_time() - start
+
+    def stop(self, outcome: int = OUTCOME_STOPPED) -> None:
+        if self.game is None:
+            return
+        self.send(ENDED.pack(MSG_ENDED, outcome, self.game.main.number_tick - self.game.tick_start))
+        self.game = None
+
+    def tick(self) -> None:
+        """Steps the game once and sends the delta, or the outcome if it ended."""
+        start = time.thread_time()
+        game = self.game
+        if self.controller is not None:
+            self.player_input = self.controller(game)
+        game.main.number_tick += 1
+        try:
+            game.step(self.player_input)
+        except RuntimeError:
+            # MonsterSwarm.tick refuses to run when a monster sits exactly on its target (it spawned on the player).
+            # Anything else is a bug, which SessionHost.run logs.
+            if not game.monsters.stalled():
+                raise
+            self.stop(OUTCOME_ERROR)
+        else:
+            if game.playing != Playing.GAME:
+                self.stop(OUTCOME_WIN if game.last_outcome == Playing.ENDING_WIN else OUTCOME_LOSE)
+            elif self.writer is not None and self.writer.transport.get_write_buffer_size() <= MAX_WRITE_BUFFER:
+                self.send(self.delta())
+        self.ticks += 1
+        self.cpu_seconds += time.thread_time() - start
+
+    def delta(self) -> bytes:
+        """Everything that changed since the last delta, and marks it as sent."""
+        game = self.game
+        parts = []
+        flags = 0
+        player = (int(game.player_x), int(game.player_y))
+        if player != self.sent_player:
+            flags |= DELTA_PLAYER
+            parts.append(PLAYER.pack(*player))
+            self.sent_player = player
+        monsters = game.monsters
+        x = np.floor(monsters.x).astype(np.int32)
+        y = np.floor(monsters.y).astype(np.int32)
+        changed = np.flatnonzero((x != self.sent_x) | (y != self.sent_y))
+        entries = np.empty(len(changed), dtype=MONSTER_ENTRY)
+        entries['index'] = changed
+        entries['x'] = x[changed]
+        entries['y'] = y[changed]
+        parts.append(entries.tobytes())
+        self.sent_x = x
+        self.sent_y = y
+        return DELTA.pack(MSG_DELTA, game.main.number_tick - game.tick_start, flags, len(changed)) + b''.join(parts)
+
+    def send(self, message: bytes) -> None:
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(message)
+
+
+def _setup_game(board_size: int, seed: int) -> tuple[Game, float]:
+    """A started game and the CPU time it took. Runs in the executor, off the event loop."""
+    start = time.thread_time()
+    game = new_game(board_size, random.Random(seed))
+    game.run_game()
+    return game, time.thread_time() - start
+
+
+def log_failure(task: asyncio.Task) -> None:
+    """Done callback for background tasks, whose exceptions nobody awaits."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error('task %s failed', task.get_name(), exc_info=task.exception())
+
+
+def next_bot_seed(seed: int) -> int:
+    """The seed of a bot's next game. Drawn from the last one, so it doesn't run into other bots' seeds."""
+    return random.Random(seed).getrandbits(63)
+
+
+class SessionHost:
+    """Schedules the ticks of all sessions, and serves clients that connect over TCP or a Unix socket."""
+
+    def __init__(self):
+        self.sessions: dict[int, Session] = {}
+        self.ids = itertools.count(1)
+        # (next tick time, session id, session): the earliest due session first
+        self.schedule: list[tuple[float, int, Session]] = []
+        self.wakeup = asyncio.Event()
+        # Totals of the sessions that have disconnected, so the report still covers them
+        self.closed_ticks = 0
+        self.closed_late_ticks = 0
+        self.closed_cpu_seconds = 0.0
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time()
+        # Bots being restarted; the loop only keeps weak references to tasks
+        self.restarts: set[asyncio.Task] = set()
+
+    def add(self, session: Session) -> None:
+        self.sessions[session.id] = session
+
+    def remove(self, session: Session) -> None:
+        session.closed = True
+        if self.sessions.pop(session.id, None) is not None:
+            self.closed_ticks += session.ticks
+            self.closed_late_ticks += session.late_ticks
+            self.closed_cpu_seconds += session.cpu_seconds
+
+    def schedule_ticks(self, session: Session) -> None:
+        """Ticks the session from one tick from now on, until its game ends."""
+        session.next_tick = asyncio.get_running_loop().time() + 1 / session.tps
+        heapq.heappush(self.schedule, (session.next_tick, session.id, session))
+        self.wakeup.set()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.schedule:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            delay = self.schedule[0][0] - loop.time()
+            if delay > 0:
+                # Sleep until the next tick is due, unless a new session is scheduled before that
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            due, _, session = heapq.heappop(self.schedule)
+            if session.closed or not session.playing or due != session.next_tick:
+                continue  # ended, or restarted with a new schedule
+            now = loop.time()
+            step = 1 / session.tps
+            steps = 0
+            try:
+                while session.next_tick <= now and steps < Main.MAX_CATCH_UP_STEPS and session.playing:
+                    session.tick()
+                    session.next_tick += step
+                    steps += 1
+            except Exception:
+                # One broken game mustn't stop the others
+                logger.exception('session %d failed', session.id)
+                self.fail(session)
+                continue
+            if session.next_tick <= now:
+                late = int((now - session.next_tick) / step) + 1
+                session.late_ticks += late
+                session.next_tick += late * step
+            if session.playing:
+                heapq.heappush(self.schedule, (session.next_tick, session.id, session))
+            elif session.controller is not None:
+                # Bots play again straight away
+                task = asyncio.create_task(self.restart_bot(session))
+                self.restarts.add(task)
+                task.add_done_callback(self.restarts.discard)
+                task.add_done_callback(log_failure)
+            # Let the sockets have a turn between sessions
+            await asyncio.sleep(0)
+
+    def fail(self, session: Session) -> None:
+        """Ends a session whose game raised: the client is told and disconnected."""
+        session.stop(OUTCOME_ERROR)
+        self.remove(session)
+        if session.writer is not None:
+            session.writer.close()
+
+    async def start_bot(self, board_size: int, seed: int, tps: int = Main.TPS) -> Session:
+        session = Session(next(self.ids), tps, controller=Autopilot())
+        self.add(session)
+        await session.start(board_size, seed)
+        self.schedule_ticks(session)
+        return session
+
+    async def restart_bot(self, session: Session) -> None:
+        await session.start(session.board_size, next_bot_seed(session.seed))
+        if not session.closed:
+            self.schedule_ticks(session)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = Session(next(self.ids), writer=writer)
+        self.add(session)
+        try:
+            while True:
+                message_type = (await reader.readexactly(1))[0]
+                if message_type == MSG_START:
+                    body = await reader.readexactly(START.size - 1)
+                    _, board_size, seed = START.unpack(bytes((message_type,)) + body)
+                    if not 2 <= board_size <= MAX_BOARD_SIZE:
+                        session.send(ERROR.pack(MSG_ERROR, ERROR_BAD_SIZE))
+                        await writer.drain()
+                        break
+                    session.stop()
+                    await session.start(board_size, seed)
+                    self.schedule_ticks(session)
+                elif message_type == MSG_INPUT:
+                    keys = (await reader.readexactly(INPUT.size - 1))[0]
+                    session.player_input = keys_to_input(keys)
+                elif message_type == MSG_STOP:
+                    session.stop()
+                else:
+                    # Not speaking the protocol
+                    session.send(ERROR.pack(MSG_ERROR, ERROR_UNKNOWN_MESSAGE))
+                    await writer.drain()
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.remove(session)
+            writer.close()
+
+    def report(self) -> dict:
+        """CPU use per tick over all sessions so far, and how many 60 TPS sessions that makes one core worth."""
+        ticks = self.closed_ticks + sum(session.ticks for session in self.sessions.values())
+        cpu_seconds = self.closed_cpu_seconds + sum(session.cpu_seconds for session in self.sessions.values())
+        cpu_per_tick = cpu_seconds / ticks if ticks else 0.0
+        wall = time.perf_counter() - self.started
+        return {
+            'sessions': len(self.sessions),
+            'ticks': ticks,
+            'late_ticks': self.closed_late_ticks + sum(session.late_ticks for session in self.sessions.values()),
+            'tick_cpu_us': cpu_per_tick * 1e6,
+            'sessions_per_core': 1 / (cpu_per_tick * Main.TPS) if ticks else None,
+            # Everything the process did, including the event loop and scheduling, as a share of one core
+            'process_load': (time.process_time() - self.started_cpu) / wall if wall else 0.0,
+        }
+
+
+def print_report(report: dict) -> None:
+    if report['sessions_per_core'] is None:
+        print(f'{report["sessions"]} sessions, no ticks yet')
+        return
+    print(f'{report["sessions"]} sessions, {report["ticks"]} ticks ({report["late_ticks"]} late), '
+          f'{report["tick_cpu_us"]:.0f} us CPU per tick, '
+          f'~{report["sessions_per_core"]:.0f} sessions per core at {Main.TPS} TPS, '
+          f'process load {report["process_load"]:.0%}')
+
+
+async def serve(host: SessionHost, tcp: Optional[str], unix: Optional[str], report_every: float) -> None:
+    servers = []
+    if tcp is not None:
+        address, port = tcp.rsplit(':', 1)
+        servers.append(await asyncio.start_server(host.handle_client, address, int(port)))
+    if unix is not None:
+        servers.append(await asyncio.start_unix_server(host.handle_client, unix))
+    scheduler = asyncio.create_task(host.run())
+    scheduler.add_done_callback(log_failure)
+    try:
+        while True:
+            await asyncio.sleep(report_every)
+            print_report(host.report())
+    finally:
+        scheduler.cancel()
+        for server in servers:
+            server.close()
+
+
+async def measure(sessions: int, seconds: float, board_size: int, seed: int) -> dict:
+    """Runs local autopilot bots for a while, then reports."""
+    host = SessionHost()
+    await asyncio.gather(*(host.start_bot(board_size, seed + i) for i in range(sessions)))
+    scheduler = asyncio.create_task(host.run())
+    scheduler.add_done_callback(log_failure)
+    # Generating the boards took a while; only count what happens from here on
+    for session in host.sessions.values():
+        session.ticks = session.late_ticks = 0
+        session.cpu_seconds = 0.0
+    host.started = time.perf_counter()
+    host.started_cpu = time.process_time()
+    await asyncio.sleep(seconds)
+    scheduler.cancel()
+    return host.report()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tcp', help='listen on HOST:PORT')
+    parser.add_argument('--unix', help='listen on this Unix socket path')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between load reports')
+    parser.add_argument('--report', action='store_true',
+                        help='instead of serving, run --sessions local bots for --seconds and report the load')
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--size', type=int, default=26, help='board size for --report')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.report:
+        print_report(asyncio.run(measure(args.sessions, args.seconds, args.size, args.seed)))
+    elif args.tcp is None and args.unix is None:
+        parser.error('give --tcp and/or --unix, or --report')
+    else:
+        asyncio.run(serve(SessionHost(), args.tcp, args.unix, args.report_every))
+
+
+if __name__ == '__main__':
+    main()